@@ -1,17 +1,76 @@
 from __future__ import annotations
 
-from pathlib import Path
-from typing import Any
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, Type, TypeVar
+
+from pydantic import BaseModel
 
 from app.utils.llm_client import LLMClient
+from app.utils.prompts import PromptRegistry
+from app.utils.serialization import dumps
+from app.utils.tracing import span
+
+T = TypeVar("T")
 
 
+@lru_cache(maxsize=None)
+def _schema_json(schema: Type[BaseModel]) -> str:
+    return dumps(schema.model_json_schema())
+
 
 class BaseAgent:
-    def __init__(self, llm: LLMClient) -> None:
+    # Label used for per-agent LLM stats
+    name = "agent"
+
+    def __init__(self, llm: LLMClient, prompts: PromptRegistry) -> None:
         self.llm = llm
-        self.prompts_dir = Path(__file__).resolve().parents[1] / "prompts"
+        self.prompts = prompts
+        # Schema-guided repair calls per unusable output (0 disables repair)
+        self.repair_attempts = max(0, int(os.getenv("AETHER_JSON_REPAIR_ATTEMPTS", "1")))
+        self.repair_max_chars = int(os.getenv("AETHER_JSON_REPAIR_MAX_CHARS", "20000"))
 
     def _read_prompt(self, filename: str) -> str:
-        path = self.prompts_dir / filename
-        return path.read_text(encoding="utf-8")
+        return self.prompts.get(filename)
+
+    async def _parse(self, content: str, schema: Type[BaseModel], build: Callable[[Dict[str, Any]], T]) -> T:
+        """
+        ``build(parse_json(content))``; when that fails, ask the LLM to repair the output.
+
+        The repair prompt carries only the schema, the error and the broken
+        output (capped at ``AETHER_JSON_REPAIR_MAX_CHARS``), so it costs far
+        less than re-running the agent. The last error is raised if every
+        attempt fails.
+        """
+        with span("json.parse", **{"agent": self.name, "json.chars": len(content)}) as parse_span:
+            try:
+                result = build(self.llm.parse_json(content))
+                parse_span.set(**{"json.ok": True})
+                return result
+            except Exception as e:
+                parse_span.set(**{"json.ok": False, "json.error": str(e)[:200]})
+                error = e
+        self.llm.record_parse_failure(self.name)
+
+        for attempt in range(self.repair_attempts):
+            with span("json.repair", **{"agent": self.name, "json.attempt": attempt + 1}) as repair_span:
+                prompt = self.prompts.render(
+                    "repair_prompt.txt",
+                    error=str(error)[:500],
+                    schema_json=_schema_json(schema),
+                    llm_output=content[:self.repair_max_chars],
+                )
+                repaired = await self.llm.acompletion(prompt, agent=self.name, temperature=0.0)
+                try:
+                    result = build(self.llm.parse_json(repaired))
+                except Exception as e:
+                    repair_span.set(**{"json.ok": False})
+                    self.llm.record_repair(self.name, succeeded=False)
+                    # Repair the repaired text next, so a retry is not a memo hit of the same prompt
+                    error, content = e, repaired
+                    continue
+                repair_span.set(**{"json.ok": True})
+            self.llm.record_repair(self.name, succeeded=True)
+            return result
+
+        raise error
@@ -1,43 +1,211 @@
 from __future__ import annotations
 
-import json
-from typing import List
+import asyncio
+import os
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
 from fastapi import HTTPException
 
 from app.agents.base_agent import BaseAgent
 from app.schemas.context import ReasoningContext
-from app.schemas.factor import Factor, DomainEnum
+from app.schemas.factor import DomainEnum, Factor, FactorList
+from app.utils.compaction import estimate_tokens, overlapping_chunks, tokenize
+from app.utils.json_stream import JsonArrayStreamParser
+from app.utils.llm_client import LLMClient
+from app.utils.prompts import PromptRegistry
+from app.utils.serialization import model_json
+from app.utils.tracing import current_span, span, start_span
+
+
+def _overlap(a: Set[str], b: Set[str]) -> float:
+    # Overlap coefficient: tolerant of one description being a longer paraphrase
+    return len(a & b) / min(len(a), len(b)) if a and b else 0.0
+
+
+def merge_factors(candidates: List[Factor], max_factors: int, similarity: float) -> List[Factor]:
+    """
+    Reduce step of chunked extraction: deduplicate candidates and renumber them F1..Fn.
+
+    Candidates in the same domain whose description terms overlap by at least
+    ``similarity`` are one factor. Factors found in more chunks rank first,
+    ties keep document order, and at most ``max_factors`` are kept.
+    """
+    groups: List[Dict[str, Any]] = []
+    for factor in candidates:
+        # Keep single-character terms so "Plant 1" and "Plant 2" stay distinct
+        terms = set(tokenize(factor.description, min_length=1))
+        for group in groups:
+            if group["factor"].domain == factor.domain and _overlap(terms, group["terms"]) >= similarity:
+                group["count"] += 1
+                break
+        else:
+            groups.append({"factor": factor, "terms": terms, "count": 1})
+
+    groups.sort(key=lambda group: -group["count"])
+    return [
+        Factor(factor_id=f"F{i}", description=group["factor"].description, domain=group["factor"].domain)
+        for i, group in enumerate(groups[:max_factors], start=1)
+    ]
 
 
 class FactorExtractorAgent(BaseAgent):
-    async def extract_factors(self, context: ReasoningContext) -> List[Factor]:
-        prompt_template = self._read_prompt("factor_prompt.txt")
-        prompt = prompt_template.format(context_json=context.json())
+    """
+    Extracts the factors to debate from a context.
+
+    Contexts larger than ``AETHER_LONG_DOC_TOKENS`` (estimated) are handled as
+    a map-reduce: the narrative is split into overlapping windows of
+    ``AETHER_EXTRACT_CHUNK_TOKENS`` sharing ``AETHER_EXTRACT_OVERLAP_TOKENS``,
+    factors are extracted from every window concurrently, and the candidates
+    are merged by ``merge_factors`` without another LLM call. Latency then
+    follows the slowest chunk rather than the document length.
+    """
+
+    name = "factor_extractor"
 
-        content = await self.llm.acompletion(prompt)
+    def __init__(self, llm: LLMClient, prompts: PromptRegistry) -> None:
+        super().__init__(llm, prompts)
+        self.long_doc_tokens = int(os.getenv("AETHER_LONG_DOC_TOKENS", "12000"))
+        self.chunk_tokens = max(500, int(os.getenv("AETHER_EXTRACT_CHUNK_TOKENS", "6000")))
+        self.overlap_tokens = max(0, int(os.getenv("AETHER_EXTRACT_OVERLAP_TOKENS", "500")))
+        self.max_factors = max(1, int(os.getenv("AETHER_MAX_FACTORS", "6")))
+        self.dedup_similarity = float(os.getenv("AETHER_FACTOR_DEDUP_SIMILARITY", "0.7"))
 
-        print("\n" + "="*60)
-        print("🔍 RAW LLM OUTPUT (FACTOR EXTRACTOR):")
-        print(content)
-        print("="*60 + "\n")
+    def _build_prompt(self, context: ReasoningContext) -> str:
+        return self.prompts.render("factor_prompt.txt", context_json=model_json(context))
 
+    @staticmethod
+    def _to_factor(rf: Dict[str, Any]) -> Factor:
+        # Normalize domain to enum
+        domain_value = str(rf.get("domain", "")).strip().lower()
         try:
-            data = self.llm.parse_json(content)
-            raw_factors = data.get("factors", [])
-            factors: List[Factor] = []
-            for rf in raw_factors:
-                # Normalize domain to enum
-                domain_value = str(rf.get("domain", "")).strip().lower()
-                try:
-                    rf["domain"] = DomainEnum(domain_value)
-                except ValueError:
-                    raise HTTPException(status_code=422, detail=f"Invalid domain: {domain_value}")
-                factors.append(Factor(**rf))
-            if not factors:
-                raise HTTPException(status_code=422, detail="No factors extracted")
-            return factors
+            rf["domain"] = DomainEnum(domain_value)
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid domain: {domain_value}")
+        return Factor(**rf)
+
+    def _to_factors(self, data: Dict[str, Any]) -> List[Factor]:
+        """
+        The valid factors of ``data``.
+
+        An element with an unknown domain or bad fields is dropped, as the
+        streaming path does, so one bad element does not fail the analysis;
+        422 only when no element is usable.
+        """
+        factors: List[Factor] = []
+        rejected: Optional[Exception] = None
+        for rf in data.get("factors", []):
+            try:
+                factors.append(self._to_factor(rf))
+            except (HTTPException, ValueError) as e:
+                rejected = rejected or e
+        if not factors:
+            reason = f": {getattr(rejected, 'detail', rejected)}" if rejected is not None else ""
+            raise HTTPException(status_code=422, detail=f"No factors extracted{reason}")
+        return factors
+
+    async def _parse_factors(self, content: str) -> List[Factor]:
+        try:
+            return await self._parse(content, FactorList, self._to_factors)
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(status_code=422, detail=f"Factor parsing failed: {e}")
+
+    @staticmethod
+    def _feed(parser: JsonArrayStreamParser, chunk: str) -> List[Dict[str, Any]]:
+        # Only parsing errors become 422; LLM errors from the stream propagate as they are
+        try:
+            return parser.feed(chunk)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Factor parsing failed: {e}")
+
+    def is_long(self, context: ReasoningContext) -> bool:
+        return self.long_doc_tokens > 0 and estimate_tokens(model_json(context)) > self.long_doc_tokens
+
+    def _chunk_contexts(self, context: ReasoningContext) -> List[ReasoningContext]:
+        windows = overlapping_chunks(context.narrative, self.chunk_tokens, self.overlap_tokens) or [""]
+        metrics = context.metrics
+        n = len(windows)
+        # Table metrics arrive in page order, so contiguous slices roughly follow the windows
+        return [
+            context.model_copy(update={
+                "narrative": window,
+                "metrics": metrics[i * len(metrics) // n:(i + 1) * len(metrics) // n],
+            })
+            for i, window in enumerate(windows)
+        ]
+
+    async def _extract_chunked(self, context: ReasoningContext) -> List[Factor]:
+        chunks = self._chunk_contexts(context)
+        results = await asyncio.gather(
+            *(self._extract_single(chunk) for chunk in chunks), return_exceptions=True
+        )
+        candidates = [factor for result in results if isinstance(result, list) for factor in result]
+        if not candidates:
+            # Every chunk failed (or found nothing): surface the first failure
+            raise next(result for result in results if isinstance(result, BaseException))
+
+        factors = merge_factors(candidates, self.max_factors, self.dedup_similarity)
+        current_span().set(**{
+            "factors.chunks": len(chunks),
+            "factors.candidates": len(candidates),
+            "factors.count": len(factors),
+        })
+        return factors
+
+    async def extract_factors(self, context: ReasoningContext) -> List[Factor]:
+        if self.is_long(context):
+            return await self._extract_chunked(context)
+        return await self._extract_single(context)
+
+    async def _extract_single(self, context: ReasoningContext) -> List[Factor]:
+        prompt = self._build_prompt(context)
+
+        with span("factors.extract", agent=self.name) as extract_span:
+            content = await self.llm.acompletion(prompt, agent=self.name)
+            extract_span.set(**{"factors.output_chars": len(content)})
+
+            factors = await self._parse_factors(content)
+            extract_span.set(**{"factors.count": len(factors)})
+            return factors
+
+    async def stream_factors(self, context: ReasoningContext) -> AsyncIterator[Factor]:
+        """Yield each factor as soon as its JSON object closes in the streamed output."""
+        if self.is_long(context):
+            # The reduce step needs every chunk's candidates before any factor is final
+            for factor in await self._extract_chunked(context):
+                yield factor
+            return
+
+        prompt = self._build_prompt(context)
+        parser = JsonArrayStreamParser("factors")
+        count = 0
+
+        # Not made current: the consumer runs between factors in its own context
+        extract_span = start_span("factors.extract", agent=self.name, **{"factors.streamed": True})
+        try:
+            async with aclosing(self.llm.astream(prompt, agent=self.name)) as chunks:
+                async for chunk in chunks:
+                    for rf in self._feed(parser, chunk):
+                        try:
+                            factor = self._to_factor(rf)
+                        except (HTTPException, ValueError):
+                            continue  # malformed element, dropped as _to_factors does
+                        count += 1
+                        yield factor
+
+            extract_span.set(**{"factors.output_chars": len(parser.text)})
+
+            if count == 0:
+                # Output did not have the expected shape; fall back to a full parse (and repair)
+                extract_span.set(**{"factors.full_parse": True})
+                for factor in await self._parse_factors(parser.text):
+                    count += 1
+                    yield factor
+        except (Exception, asyncio.CancelledError) as e:
+            extract_span.end(error=e)
+            raise
+        finally:
+            extract_span.set(**{"factors.count": count})
+            extract_span.end()
@@ -5,9 +5,12 @@ from fastapi import HTTPException
 from app.agents.base_agent import BaseAgent
 from app.schemas.factor import Factor
 from app.schemas.debate import SupportArguments, OppositionCounterArguments
+from app.utils.serialization import model_json
 
 
 class OppositionAgent(BaseAgent):
+    name = "opposition"
+
     async def generate_counters(
         self, factor: Factor, support: SupportArguments
     ) -> OppositionCounterArguments:
@@ -15,15 +18,16 @@ class OppositionAgent(BaseAgent):
 
         prompt = (
             f"{prompt_template}\n\n"
-            f"Factor:\n{factor.model_dump_json()}\n\n"
-            f"Support Output:\n{support.model_dump_json()}"
+            f"Factor:\n{model_json(factor)}\n\n"
+            f"Support Output:\n{model_json(support)}"
         )
 
-        content = await self.llm.acompletion(prompt)
+        content = await self.llm.acompletion(prompt, agent=self.name)
 
         try:
-            data = self.llm.parse_json(content)
-            return OppositionCounterArguments(**data)
+            return await self._parse(
+                content, OppositionCounterArguments, lambda data: OppositionCounterArguments(**data)
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=422,
@@ -1,34 +1,77 @@
 from __future__ import annotations
 
+from contextlib import aclosing
+from typing import AsyncIterator
+
 from fastapi import HTTPException
 
 from app.agents.base_agent import BaseAgent
 from app.schemas.context import ReasoningContext
 from app.schemas.factor import Factor
-from app.schemas.debate import SupportArguments
+from app.schemas.debate import SupportArgument, SupportArguments
+from app.utils.json_stream import JsonArrayStreamParser
+from app.utils.serialization import model_json
 
 
 class SupportAgent(BaseAgent):
-    async def generate_support(self, factor: Factor, context: ReasoningContext) -> SupportArguments:
+    name = "support"
+
+    def _build_prompt(self, factor: Factor, context: ReasoningContext) -> str:
         prompt_template = self._read_prompt("support_prompt.txt")
 
-        prompt = (
+        return (
             f"{prompt_template}\n\n"
-            f"Context:\n{context.model_dump_json()}\n\n"
-            f"Factor:\n{factor.model_dump_json()}"
+            f"Context:\n{model_json(context)}\n\n"
+            f"Factor:\n{model_json(factor)}"
         )
 
-        content = await self.llm.acompletion(prompt)
+    async def generate_support(self, factor: Factor, context: ReasoningContext) -> SupportArguments:
+        prompt = self._build_prompt(factor, context)
+
+        content = await self.llm.acompletion(prompt, agent=self.name)
+        return await self._parse_support(content)
 
+    async def _parse_support(self, content: str) -> SupportArguments:
         try:
-            data = self.llm.parse_json(content)
-            return SupportArguments(**data)
+            return await self._parse(content, SupportArguments, lambda data: SupportArguments(**data))
         except Exception as e:
-            raise HTTPException(
-                status_code=422,
-                detail={
-                    "error": "Support arguments parsing failed",
-                    "reason": str(e),
-                    "llm_output": content,
-                },
-            )
+            raise self._parse_failed(e, content)
+
+    @staticmethod
+    def _parse_failed(error: Exception, content: str) -> HTTPException:
+        return HTTPException(
+            status_code=422,
+            detail={
+                "error": "Support arguments parsing failed",
+                "reason": str(error),
+                "llm_output": content,
+            },
+        )
+
+    async def stream_support(
+        self, factor: Factor, context: ReasoningContext
+    ) -> AsyncIterator[SupportArgument]:
+        """Yield each support argument as soon as its JSON object closes in the streamed output."""
+        prompt = self._build_prompt(factor, context)
+        parser = JsonArrayStreamParser("support_arguments")
+        count = 0
+
+        # Only parsing errors become 422; LLM errors from the stream propagate as they are
+        async with aclosing(self.llm.astream(prompt, agent=self.name)) as chunks:
+            async for chunk in chunks:
+                try:
+                    completed = parser.feed(chunk)
+                except Exception as e:
+                    raise self._parse_failed(e, parser.text)
+                for raw in completed:
+                    try:
+                        argument = SupportArgument(**raw)
+                    except ValueError:
+                        continue  # malformed element; the rest of the stream may still be usable
+                    count += 1
+                    yield argument
+
+        if count == 0:
+            # Output did not have the expected shape; fall back to a full parse (and repair)
+            for argument in (await self._parse_support(parser.text)).support_arguments:
+                yield argument
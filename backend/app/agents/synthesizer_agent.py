@@ -6,27 +6,29 @@ from app.agents.base_agent import BaseAgent
 from app.schemas.context import ReasoningContext
 from app.schemas.debate import DebateTrace
 from app.schemas.final_report import FinalReport
+from app.utils.serialization import model_json
 
 
 class SynthesizerAgent(BaseAgent):
+    name = "synthesizer"
+
     async def generate_report(
         self, context: ReasoningContext, debates: list[DebateTrace]
     ) -> FinalReport:
         prompt_template = self._read_prompt("synthesis_prompt.txt")
 
-        debates_json = "[" + ",".join(d.model_dump_json() for d in debates) + "]"
+        debates_json = "[" + ",".join(model_json(d) for d in debates) + "]"
 
         prompt = (
             f"{prompt_template}\n\n"
-            f"Context:\n{context.model_dump_json()}\n\n"
+            f"Context:\n{model_json(context)}\n\n"
             f"Debate Traces:\n{debates_json}"
         )
 
-        content = await self.llm.acompletion(prompt)
+        content = await self.llm.acompletion(prompt, agent=self.name)
 
         try:
-            data = self.llm.parse_json(content)
-            return FinalReport(**data)
+            return await self._parse(content, FinalReport, lambda data: FinalReport(**data))
         except Exception as e:
             raise HTTPException(
                 status_code=422,
@@ -0,0 +1,129 @@
+"""Batch analysis of many contexts or PDFs under one shared concurrency budget."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Sequence, Tuple, Union
+
+from fastapi import HTTPException
+
+from app.orchestrator import AetherOrchestrator
+from app.schemas.context import ReasoningContext
+from app.utils.parse_pool import PageLimitExceeded, ParsePool, ParseTimeout
+
+# A batch item: display name plus a context, the path of a PDF on disk, or the
+# exception raised while receiving that document (reported as its failure)
+BatchSource = Union[ReasoningContext, str, Exception]
+BatchItem = Tuple[str, BatchSource]
+
+
+def context_from_pdf(pdf_data: Dict[str, Any]) -> ReasoningContext:
+    return ReasoningContext(
+        narrative=pdf_data["text"],
+        extracted_facts=[],
+        metrics=pdf_data.get("metrics", []),
+        assumptions=[],
+        limitations=[],
+    )
+
+
+def _describe_error(error: Exception) -> Dict[str, Any]:
+    if isinstance(error, HTTPException):
+        return {"status_code": error.status_code, "detail": error.detail}
+    if isinstance(error, PageLimitExceeded):
+        return {"status_code": 413, "detail": str(error)}
+    if isinstance(error, ParseTimeout):
+        return {"status_code": 504, "detail": str(error)}
+    if isinstance(error, ValueError):
+        # Unreadable PDFs and invalid contexts
+        return {"status_code": 422, "detail": str(error)}
+    return {"status_code": 500, "detail": str(error)}
+
+
+class BatchRunner:
+    """
+    Analyzes many documents while sharing one budget across all batches.
+
+    At most ``AETHER_BATCH_CONCURRENCY`` documents are in flight per worker
+    process, whichever batch they belong to, and PDF parse jobs are admitted
+    only as fast as the parse pool has workers, so a large batch never piles
+    up parse jobs that would hit the parse timeout while queued. LLM calls go
+    through the orchestrator's shared ``LLMClient`` and its concurrency limit.
+    A failing item is reported in place and never aborts the rest of the batch.
+    """
+
+    def __init__(self, orchestrator: AetherOrchestrator, parse_pool: ParsePool) -> None:
+        self.orchestrator = orchestrator
+        self.parse_pool = parse_pool
+        self.concurrency = max(1, int(os.getenv("AETHER_BATCH_CONCURRENCY", "4")))
+        self.max_items = max(1, int(os.getenv("AETHER_BATCH_MAX_ITEMS", "500")))
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._parse_slots = asyncio.Semaphore(max(1, parse_pool.workers))
+
+    async def run(self, items: Sequence[BatchItem], use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Analyze every item and return per-item outcomes (input order) plus throughput stats.
+
+        Raises:
+            HTTPException: 413 if the batch has more than ``AETHER_BATCH_MAX_ITEMS`` items
+        """
+        if len(items) > self.max_items:
+            raise HTTPException(
+                status_code=413, detail=f"Batch exceeds the {self.max_items} item limit"
+            )
+
+        llm_calls_before = self._llm_calls()
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self._run_item(index, name, source, use_cache) for index, (name, source) in enumerate(items))
+        )
+        elapsed = time.perf_counter() - started
+        llm_calls = self._llm_calls() - llm_calls_before
+
+        succeeded = sum(1 for item in results if item["status"] == "succeeded")
+        minutes = elapsed / 60 if elapsed > 0 else 0
+        return {
+            "items": results,
+            "stats": {
+                "items": len(results),
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "elapsed_seconds": round(elapsed, 3),
+                "docs_per_minute": round(succeeded / minutes, 2) if minutes else 0.0,
+                "llm_calls": llm_calls,
+                "llm_calls_per_minute": round(llm_calls / minutes, 2) if minutes else 0.0,
+                "concurrency": self.concurrency,
+            },
+        }
+
+    async def _run_item(
+        self, index: int, name: str, source: BatchSource, use_cache: bool
+    ) -> Dict[str, Any]:
+        async with self._slots:
+            started = time.perf_counter()
+            outcome: Dict[str, Any] = {"index": index, "name": name}
+            try:
+                if isinstance(source, Exception):
+                    raise source
+                if isinstance(source, ReasoningContext):
+                    context = source
+                else:
+                    async with self._parse_slots:
+                        pdf_data = await self.parse_pool.parse_file(source)
+                    context = context_from_pdf(pdf_data)
+                outcome["result"] = await self.orchestrator.analyze(context, use_cache=use_cache)
+                outcome["status"] = "succeeded"
+            except Exception as e:
+                outcome["status"] = "failed"
+                outcome["error"] = _describe_error(e)
+                if outcome["error"]["status_code"] == 500:
+                    print(f"Warning: Batch item {name!r} failed: {e}")
+            outcome["seconds"] = round(time.perf_counter() - started, 3)
+            return outcome
+
+    def _llm_calls(self) -> int:
+        # Counted per worker process, so concurrent non-batch traffic is included
+        agents = self.orchestrator.llm.memo_stats()["agents"]
+        return sum(stats["llm_calls"] for stats in agents.values())
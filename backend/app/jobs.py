@@ -0,0 +1,341 @@
+"""Background analysis jobs with a bounded worker pool and persisted state."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.orchestrator import AetherOrchestrator
+from app.schemas.context import ReasoningContext
+from app.utils.metrics import JOB_QUEUE_DEPTH
+from app.utils.serialization import dumps, model_dict
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+# Seconds between sweeps that delete finished records older than AETHER_JOB_TTL
+PRUNE_INTERVAL = 600
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its limit."""
+
+
+class JobManager:
+    """
+    Runs ``AetherOrchestrator.analyze`` for submitted contexts in the background.
+
+    ``AETHER_JOB_WORKERS`` worker tasks drain a queue of at most
+    ``AETHER_JOB_QUEUE_LIMIT`` pending jobs; submitting beyond that raises
+    ``JobQueueFull`` so the API can answer 429. Every state change is written
+    to ``<store_dir>/<job_id>.json`` (atomically, off the event loop), which
+    lets any worker answer status queries.
+
+    Several worker processes share the store, so each unfinished job is
+    owned through ``<job_id>.claim``: created with ``O_EXCL`` on submit and
+    holding the owner and a heartbeat refreshed every quarter of
+    ``AETHER_JOB_LEASE`` seconds. A job whose lease expired (its process
+    died or hung) is taken over by exactly one other worker and re-queued;
+    live jobs are never run twice. Finished jobs are dropped from memory once
+    persisted and served from disk; records older than ``AETHER_JOB_TTL``
+    seconds are pruned on start and every ``PRUNE_INTERVAL`` seconds.
+    """
+
+    def __init__(self, orchestrator: AetherOrchestrator, store_dir: Path) -> None:
+        self.orchestrator = orchestrator
+        self.store_dir = store_dir
+        self.workers = max(1, int(os.getenv("AETHER_JOB_WORKERS", "2")))
+        self.queue_limit = max(1, int(os.getenv("AETHER_JOB_QUEUE_LIMIT", "32")))
+        self.ttl_seconds = float(os.getenv("AETHER_JOB_TTL", "86400"))
+        self.lease_seconds = max(1.0, float(os.getenv("AETHER_JOB_LEASE", "60")))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Unfinished jobs this process owns; finished ones are read from disk
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._write_locks: Dict[str, asyncio.Lock] = {}
+
+    async def start(self) -> None:
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._queue = asyncio.Queue()
+        await asyncio.to_thread(self._prune)
+        await self._recover(unclaimed=True)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self._expire, list(self._jobs))
+        self._jobs.clear()
+
+    async def submit(self, context: ReasoningContext, use_cache: bool = True) -> Dict[str, Any]:
+        if self._queue is None:
+            raise RuntimeError("JobManager.start() has not been called")
+        if self._queue.qsize() >= self.queue_limit:
+            raise JobQueueFull(f"Job queue is full ({self.queue_limit} pending)")
+
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "progress": {"stage": "queued"},
+            "request": {"context": model_dict(context), "use_cache": use_cache},
+            "result": None,
+            "error": None,
+        }
+        # Claimed before the record exists, so no other worker can adopt it
+        await asyncio.to_thread(self._claim, job["job_id"])
+        self._jobs[job["job_id"]] = job
+        await self._persist(job)
+        self._queue.put_nowait(job["job_id"])
+        JOB_QUEUE_DEPTH.set(self._queue.qsize())
+        return self.public_view(job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Jobs held here are current; finished ones and those of other worker processes are on disk
+        job = self._jobs.get(job_id) or await asyncio.to_thread(self._load, job_id)
+        return self.public_view(job) if job is not None else None
+
+    @staticmethod
+    def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in job.items() if key != "request"}
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            JOB_QUEUE_DEPTH.set(self._queue.qsize())
+            try:
+                job = self._jobs.get(job_id)
+                if job is not None:
+                    await self._run(job)
+                    if self._jobs.get(job_id) is job:
+                        del self._jobs[job_id]
+                        await asyncio.to_thread(self._release, job_id)
+            finally:
+                self._queue.task_done()
+
+    async def _maintain(self) -> None:
+        """Heartbeat our leases, adopt jobs whose lease expired and prune old records."""
+        last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 4)
+            try:
+                for job_id in await asyncio.to_thread(self._heartbeat, list(self._jobs)):
+                    # Our heartbeat stalled past the lease and another worker took the job
+                    print(f"Warning: Lost the lease on job {job_id}; another worker owns it now")
+                    self._jobs.pop(job_id, None)
+                await self._recover(unclaimed=False)
+                if time.monotonic() - last_prune >= PRUNE_INTERVAL:
+                    last_prune = time.monotonic()
+                    await asyncio.to_thread(self._prune)
+            except Exception as e:
+                print(f"Warning: Job maintenance failed: {e}")
+
+    async def _recover(self, unclaimed: bool) -> None:
+        for job in await asyncio.to_thread(self._adopt, unclaimed):
+            # Interrupted with its worker: run it again from the persisted request
+            job["status"] = "queued"
+            job["progress"] = {"stage": "queued"}
+            self._jobs[job["job_id"]] = job
+            await self._persist(job)
+            self._queue.put_nowait(job["job_id"])
+        JOB_QUEUE_DEPTH.set(self._queue.qsize())
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job["status"] = "running"
+        job["progress"] = {"stage": "starting"}
+        await self._persist(job)
+
+        async def on_event(event: str, payload: Dict[str, Any]) -> None:
+            progress = job["progress"]
+            if event == "stage":
+                progress["stage"] = payload["stage"]
+                if "total_factors" in payload:
+                    progress["total_factors"] = payload["total_factors"]
+                    # Debates may have finished while extraction was still streaming
+                    progress.setdefault("completed_factors", 0)
+            elif event == "debate_started":
+                progress["factor_id"] = payload["factor_id"]
+                progress.setdefault("active_factors", []).append(payload["factor_id"])
+            elif event in ("debate", "debate_error"):
+                progress["completed_factors"] = progress.get("completed_factors", 0) + 1
+                if payload["factor_id"] in progress.get("active_factors", []):
+                    progress["active_factors"].remove(payload["factor_id"])
+            else:
+                return
+            await self._persist(job)
+
+        try:
+            context = ReasoningContext(**job["request"]["context"])
+            job["result"] = await self.orchestrator.analyze(
+                context, use_cache=job["request"]["use_cache"], on_event=on_event
+            )
+            job["status"] = "succeeded"
+            job["progress"]["stage"] = "done"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = getattr(e, "detail", None) or str(e)
+        await self._persist(job)
+
+    def _path(self, job_id: str) -> Path:
+        return self.store_dir / f"{job_id}.json"
+
+    async def _persist(self, job: Dict[str, Any]) -> None:
+        if self._jobs.get(job["job_id"]) is not job:
+            # Lease lost: the record belongs to the new owner
+            return
+        job["updated_at"] = time.time()
+        data = dumps(job)
+        # Snapshot first, then write under a FIFO lock so files never go backwards
+        lock = self._write_locks.setdefault(job["job_id"], asyncio.Lock())
+        async with lock:
+            await asyncio.to_thread(self._write, job["job_id"], data)
+        if job["status"] in ("succeeded", "failed") and not lock.locked():
+            self._write_locks.pop(job["job_id"], None)
+
+    def _write(self, job_id: str, data: str) -> None:
+        path = self._path(job_id)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        # Job ids are uuid4 hex; anything else cannot name a stored job
+        if len(job_id) != 32 or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        try:
+            return json.loads(self._path(job_id).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _claim_path(self, job_id: str) -> Path:
+        return self.store_dir / f"{job_id}.claim"
+
+    def _lease(self, heartbeat: Optional[float] = None) -> str:
+        return json.dumps({
+            "owner": self.owner,
+            "pid": os.getpid(),
+            "heartbeat": time.time() if heartbeat is None else heartbeat,
+        })
+
+    def _read_claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._claim_path(job_id).read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _claim(self, job_id: str) -> bool:
+        """Take an unclaimed job; False if another worker holds (or just took) it."""
+        try:
+            fd = os.open(self._claim_path(job_id), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self._lease())
+        return True
+
+    def _take_over(self, job_id: str, stale: Dict[str, Any]) -> bool:
+        """Take a job whose lease expired; only the first worker to break this lease wins."""
+        owner_token = str(stale.get("owner", "")).rsplit(":", 1)[-1]
+        marker = self.store_dir / f"{job_id}.takeover-{owner_token}-{int(stale['heartbeat'] * 1e6)}"
+        try:
+            os.close(os.open(marker, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
+            return False
+        self._write_claim(job_id)
+        return True
+
+    def _write_claim(self, job_id: str, heartbeat: Optional[float] = None) -> None:
+        path = self._claim_path(job_id)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_text(self._lease(heartbeat), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _heartbeat(self, job_ids: List[str]) -> List[str]:
+        """Refresh our leases; returns the jobs whose lease another worker has taken."""
+        lost = []
+        for job_id in job_ids:
+            claim = self._read_claim(job_id)
+            if claim is not None and claim.get("owner") != self.owner:
+                lost.append(job_id)
+            else:
+                self._write_claim(job_id)
+        return lost
+
+    def _expire(self, job_ids: List[str]) -> None:
+        """Give up our leases on shutdown so another worker can adopt the jobs right away."""
+        for job_id in job_ids:
+            claim = self._read_claim(job_id)
+            if claim is None or claim.get("owner") == self.owner:
+                self._write_claim(job_id, heartbeat=0)
+
+    def _release(self, job_id: str) -> None:
+        self._claim_path(job_id).unlink(missing_ok=True)
+        for marker in self.store_dir.glob(f"{job_id}.takeover-*"):
+            marker.unlink(missing_ok=True)
+
+    def _adopt(self, unclaimed: bool) -> List[Dict[str, Any]]:
+        """
+        Claim unfinished jobs nobody is running: those whose lease expired and,
+        with ``unclaimed``, records without a claim file (written before claims
+        existed). Returns the adopted jobs, oldest first.
+        """
+        candidates = {}
+        now = time.time()
+        for path in self.store_dir.glob("*.claim"):
+            job_id = path.stem
+            claim = self._read_claim(job_id)
+            if claim is None:
+                # Created but never written: its owner died in between
+                try:
+                    claim = {"owner": "", "heartbeat": path.stat().st_mtime}
+                except FileNotFoundError:
+                    continue
+            if claim.get("owner") == self.owner:
+                continue
+            if now - claim.get("heartbeat", 0) > self.lease_seconds and self._take_over(job_id, claim):
+                candidates[job_id] = True
+        if unclaimed:
+            for path in self.store_dir.glob("*.json"):
+                job_id = path.stem
+                if job_id not in candidates and not self._claim_path(job_id).exists():
+                    job = self._load(job_id)
+                    if job is not None and job["status"] in ("queued", "running") and self._claim(job_id):
+                        candidates[job_id] = True
+
+        jobs = []
+        for job_id in candidates:
+            job = self._load(job_id)
+            if job is None or job["status"] not in ("queued", "running"):
+                # Finished (or never written) before its owner released the claim
+                self._release(job_id)
+                continue
+            jobs.append(job)
+        jobs.sort(key=lambda job: job["created_at"])
+        return jobs
+
+    def _prune(self) -> None:
+        """Delete finished records older than the TTL, and takeover markers left by crashed workers."""
+        cutoff = time.time() - self.ttl_seconds
+        for path in self.store_dir.glob("*.json"):
+            job = self._load(path.stem)
+            if job is not None and job["status"] in ("succeeded", "failed") and job["updated_at"] < cutoff:
+                path.unlink(missing_ok=True)
+        for marker in self.store_dir.glob("*.takeover-*"):
+            try:
+                if marker.stat().st_mtime < cutoff:
+                    marker.unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass
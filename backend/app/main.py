@@ -1,17 +1,93 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
-import pdfplumber
-from io import BytesIO
+from fastapi.responses import FileResponse, ORJSONResponse, Response, StreamingResponse
+from app.schemas.batch import BatchRequest
 from app.schemas.context import ReasoningContext
 from app.orchestrator import AetherOrchestrator
-from app.utils.pdf_generator import AETHERPDFGenerator
-from app.utils.pdf_parser import extract_metadata_and_text
+from app.batch import BatchRunner
+from app.jobs import JobManager, JobQueueFull
+from app.utils.parse_pool import PageLimitExceeded, ParsePool, ParseTimeout
+from app.utils import metrics
+from app.utils.runtime import LoopLagMonitor, rss_bytes
+from app.utils.sse import stream_analysis
+from app.utils.tracing import TracingMiddleware, exporter as trace_exporter, span
+from app.utils.upload import UploadSizeLimitMiddleware, receive_uploads, upload_schema
+
+if TYPE_CHECKING:
+    from app.utils.pdf_generator import AETHERPDFGenerator
+
+# Heavy dependencies (Camelot/OpenCV in the parser, ReportLab in the generator,
+# the Gemini SDK) are imported on first use or by the prewarm, never here
+orchestrator = AetherOrchestrator()
+parse_pool = ParsePool()
+job_manager = JobManager(orchestrator, orchestrator.logs_dir / "jobs")
+batch_runner = BatchRunner(orchestrator, parse_pool)
+loop_monitor = LoopLagMonitor(observer=metrics.LOOP_LAG_SECONDS.observe)
+max_upload_bytes = int(os.getenv("AETHER_MAX_UPLOAD_MB", "100")) * 1024 * 1024
+max_batch_upload_bytes = int(os.getenv("AETHER_MAX_BATCH_UPLOAD_MB", "1024")) * 1024 * 1024
+prewarm_enabled = os.getenv("AETHER_PREWARM", "1").lower() not in ("0", "false", "no", "off")
+_pdf_generator: Optional["AETHERPDFGenerator"] = None
+
+
+def get_pdf_generator() -> "AETHERPDFGenerator":
+    """The report generator, importing ReportLab on first use."""
+    global _pdf_generator
+    if _pdf_generator is None:
+        from app.utils.pdf_generator import AETHERPDFGenerator
+
+        _pdf_generator = AETHERPDFGenerator()
+    return _pdf_generator
 
-app = FastAPI(title="Project AETHER", version="1.0.0")
+
+async def prewarm() -> None:
+    """Start the parse workers and load the report generator while traffic is already served."""
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(parse_pool.start(), asyncio.to_thread(get_pdf_generator))
+    except Exception as e:
+        # Each route still loads what it needs on first use
+        print(f"Warning: Prewarm failed: {e}")
+        return
+    print(f"Prewarm finished in {time.perf_counter() - started:.2f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor.start()
+    await orchestrator.llm.start()
+    await job_manager.start()
+    prewarm_task = asyncio.create_task(prewarm()) if prewarm_enabled else None
+    yield
+    if prewarm_task is not None and not prewarm_task.done():
+        prewarm_task.cancel()
+        try:
+            await prewarm_task
+        except asyncio.CancelledError:
+            pass
+    await job_manager.shutdown()
+    parse_pool.shutdown()
+    await loop_monitor.stop()
+    trace_exporter.flush()
+    metrics.mark_process_dead()
+
+
+# Handlers that return large results wrap them in ORJSONResponse themselves so the
+# already JSON-ready dicts skip jsonable_encoder; the default covers the rest.
+app = FastAPI(
+    title="Project AETHER",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Basic CORS setup (adjust as needed)
 app.add_middleware(
@@ -21,16 +97,50 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-
-orchestrator = AetherOrchestrator()
-pdf_generator = AETHERPDFGenerator()
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=max_upload_bytes,
+    paths=("/analyze-pdf", "/analyze-pdf-report"),
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=max_batch_upload_bytes,
+    paths=("/batch-pdf",),
+)
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+# Added last so it is outermost: the root span covers every other middleware
+app.add_middleware(TracingMiddleware)
 
 import traceback
+
+
+async def parse_upload(request: Request) -> dict:
+    """Stream the uploaded PDF to disk and parse it in the parse pool.
+
+    Guard failures are mapped to HTTP errors.
+    """
+    items = await receive_uploads(request, "file", max_upload_bytes, max_files=1)
+    if not items:
+        raise HTTPException(status_code=422, detail="A PDF must be uploaded as form field 'file'")
+    _, path = items[0]
+    if isinstance(path, HTTPException):
+        raise path
+    try:
+        return await parse_pool.parse_file(path)
+    except PageLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ParseTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    finally:
+        os.unlink(path)
+
+
 @app.post("/analyze")
-async def analyze(context: ReasoningContext):
+async def analyze(context: ReasoningContext, no_cache: bool = False):
     try:
-        result = await orchestrator.analyze(context)
-        return result
+        result = await orchestrator.analyze(context, use_cache=not no_cache)
+        return ORJSONResponse(result)
     except HTTPException:
         raise
     except Exception as e:
@@ -39,14 +149,20 @@ async def analyze(context: ReasoningContext):
         raise HTTPException(status_code=500, detail=str(e))
     
 
-@app.post("/analyze-pdf")
-async def analyze_pdf(file: UploadFile = File(...)):
+@app.post("/analyze/stream")
+async def analyze_stream(context: ReasoningContext, no_cache: bool = False):
+    """Same pipeline as /analyze, streamed as Server-Sent Events while it runs."""
+    return StreamingResponse(
+        stream_analysis(orchestrator, context, use_cache=not no_cache),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/analyze-pdf", openapi_extra=upload_schema("file"))
+async def analyze_pdf(request: Request, no_cache: bool = False):
     try:
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are supported")
-        
-        file_bytes = await file.read()
-        pdf_data = extract_metadata_and_text(file_bytes)
+        pdf_data = await parse_upload(request)
         
         context = ReasoningContext(
             narrative=pdf_data["text"],
@@ -55,8 +171,8 @@ async def analyze_pdf(file: UploadFile = File(...)):
             assumptions=[],
             limitations=[]
         )
-        result = await orchestrator.analyze(context)
-        return result
+        result = await orchestrator.analyze(context, use_cache=not no_cache)
+        return ORJSONResponse(result)
     except HTTPException:
         raise
     except Exception as e:
@@ -70,12 +186,100 @@ async def root():
     return {"service": "Project AETHER", "status": "ok"}
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the result cache and the LLM response memo."""
+    result_cache = orchestrator.result_cache
+    return {
+        "result_cache": (
+            {"enabled": True, **result_cache.stats()} if result_cache is not None else {"enabled": False}
+        ),
+        "llm_memo": orchestrator.llm.memo_stats(),
+    }
+
+
+@app.get("/llm/stats")
+async def llm_stats():
+    """Rate limiter state: retries, throttling, backoff time and the adaptive concurrency limit."""
+    return orchestrator.llm.rate_limiter.stats()
+
+
+@app.get("/pipeline/stats")
+async def pipeline_stats():
+    """Per-node timings and queue depths of running analyses and the last finished one."""
+    return orchestrator.pipeline_stats()
+
+
+@app.get("/runtime/stats")
+async def runtime_stats(window: float = 1.0):
+    """Event-loop lag (overall and worst over the last ``window`` seconds) and resident memory of this worker."""
+    stats = {"pid": os.getpid(), "rss_mb": round(rss_bytes() / 2**20, 1), "loop_lag": loop_monitor.stats(window)}
+    backend_stats = getattr(orchestrator.llm.backend, "stats", None)
+    if backend_stats is not None:
+        stats["llm_backend"] = backend_stats()
+    stats["tracing"] = trace_exporter.stats()
+    return stats
+
+
+async def prometheus_metrics():
+    """Prometheus exposition; aggregated over all workers when ``PROMETHEUS_MULTIPROC_DIR`` is set."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+if metrics.ENABLED:
+    app.add_api_route("/metrics", prometheus_metrics, methods=["GET"])
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(context: ReasoningContext, no_cache: bool = False):
+    """Queue an analysis and return its job id immediately."""
+    try:
+        return ORJSONResponse(await job_manager.submit(context, use_cache=not no_cache), status_code=202)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress (stage and current factor) and, once finished, the result."""
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ORJSONResponse(job)
+
+
+@app.post("/batch")
+async def batch(request: BatchRequest, no_cache: bool = False):
+    """Analyze many contexts under the shared batch budget; failures are reported per item."""
+    items = [(f"context-{index}", context) for index, context in enumerate(request.contexts)]
+    return ORJSONResponse(await batch_runner.run(items, use_cache=not no_cache))
+
+
+@app.post("/batch-pdf", openapi_extra=upload_schema("files", multiple=True))
+async def batch_pdf(request: Request, no_cache: bool = False):
+    """Analyze many uploaded PDFs; a bad file fails its own item, not the batch."""
+    items = await receive_uploads(request, "files", max_upload_bytes, max_files=batch_runner.max_items)
+    if not items:
+        raise HTTPException(status_code=422, detail="PDFs must be uploaded as form field 'files'")
+    try:
+        return ORJSONResponse(await batch_runner.run(items, use_cache=not no_cache))
+    finally:
+        for _, source in items:
+            if isinstance(source, str):
+                os.unlink(source)
+
+
 @app.post("/analyze-report")
-async def analyze_report(context: ReasoningContext):
+async def analyze_report(context: ReasoningContext, no_cache: bool = False):
     """Analyze text context and return PDF report."""
     try:
-        result = await orchestrator.analyze(context)
-        pdf_bytes = pdf_generator.generate_report(result, context.narrative)
+        result = await orchestrator.analyze(context, use_cache=not no_cache)
+        render_started = time.perf_counter()
+        with span("pdf.render") as render_span:
+            pdf_bytes = get_pdf_generator().generate_report(result, context.narrative)
+            render_span.set(**{"pdf.bytes": len(pdf_bytes)})
+        metrics.PDF_RENDER_SECONDS.observe(time.perf_counter() - render_started)
         
         return Response(
             content=pdf_bytes,
@@ -90,15 +294,11 @@ async def analyze_report(context: ReasoningContext):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/analyze-pdf-report")
-async def analyze_pdf_report(file: UploadFile = File(...)):
+@app.post("/analyze-pdf-report", openapi_extra=upload_schema("file"))
+async def analyze_pdf_report(request: Request, no_cache: bool = False):
     """Upload PDF, analyze it, and return PDF report."""
     try:
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are supported")
-        
-        file_bytes = await file.read()
-        pdf_data = extract_metadata_and_text(file_bytes)
+        pdf_data = await parse_upload(request)
         
         context = ReasoningContext(
             narrative=pdf_data["text"],
@@ -107,8 +307,12 @@ async def analyze_pdf_report(file: UploadFile = File(...)):
             assumptions=[],
             limitations=[]
         )
-        result = await orchestrator.analyze(context)
-        pdf_bytes = pdf_generator.generate_report(result, pdf_data["text"])
+        result = await orchestrator.analyze(context, use_cache=not no_cache)
+        render_started = time.perf_counter()
+        with span("pdf.render") as render_span:
+            pdf_bytes = get_pdf_generator().generate_report(result, pdf_data["text"])
+            render_span.set(**{"pdf.bytes": len(pdf_bytes)})
+        metrics.PDF_RENDER_SECONDS.observe(time.perf_counter() - render_started)
         
         return Response(
             content=pdf_bytes,
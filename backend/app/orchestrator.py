@@ -1,33 +1,74 @@
 from __future__ import annotations
 
+import asyncio
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set
 
 from app.agents.factor_extractor import FactorExtractorAgent
 from app.agents.support_agent import SupportAgent
 from app.agents.opposition_agent import OppositionAgent
 from app.agents.synthesizer_agent import SynthesizerAgent
+from app.pipeline import PIPELINE_MODES, DebatePipeline, EventCallback, _ignore_event
 from app.schemas.context import ReasoningContext
-from app.schemas.factor import Factor
-from app.schemas.debate import DebateTrace, SupportArguments, OppositionCounterArguments
+from app.schemas.debate import DebateTrace
 from app.schemas.final_report import FinalReport
+from app.utils.cache import ResultCache
+from app.utils.compaction import ContextCompactor
 from app.utils.logger import ReasoningLogger
 from app.utils.llm_client import LLMClient
+from app.utils.prompts import PromptRegistry
+from app.utils.serialization import model_dict, serialization_scope
+from app.utils.tracing import current_span, current_trace, span
+
+
+DEBATE_FAILURE_POLICIES = ("fail_fast", "partial")
 
 
 class AetherOrchestrator:
     """Central controller that enforces program flow and logging."""
 
     def __init__(self) -> None:
+        self.debate_concurrency = max(1, int(os.getenv("AETHER_DEBATE_CONCURRENCY", "6")))
+        self.debate_failure_policy = os.getenv("AETHER_DEBATE_FAILURE_POLICY", "fail_fast").lower()
+        if self.debate_failure_policy not in DEBATE_FAILURE_POLICIES:
+            raise ValueError(
+                f"AETHER_DEBATE_FAILURE_POLICY must be one of {DEBATE_FAILURE_POLICIES}, "
+                f"got {self.debate_failure_policy!r}"
+            )
+        self.pipeline_mode = os.getenv("AETHER_PIPELINE_MODE", "pipelined").lower()
+        if self.pipeline_mode not in PIPELINE_MODES:
+            raise ValueError(
+                f"AETHER_PIPELINE_MODE must be one of {PIPELINE_MODES}, got {self.pipeline_mode!r}"
+            )
+        self.pipeline_queue_size = max(1, int(os.getenv("AETHER_PIPELINE_QUEUE_SIZE", "16")))
+        self._active_pipelines: Set[DebatePipeline] = set()
+        self._last_pipeline: Optional[DebatePipeline] = None
+        # Stream LLM output so debates start on each factor as soon as it is parsed
+        self.llm_streaming = os.getenv("AETHER_LLM_STREAMING", "1").lower() in ("1", "true", "yes", "on")
         self.llm = LLMClient()
-        self.factor_extractor = FactorExtractorAgent(self.llm)
-        self.support_agent = SupportAgent(self.llm)
-        self.opposition_agent = OppositionAgent(self.llm)
-        self.synthesizer_agent = SynthesizerAgent(self.llm)
+        self.prompts = PromptRegistry(Path(__file__).resolve().parent / "prompts")
+        self.factor_extractor = FactorExtractorAgent(self.llm, self.prompts)
+        self.support_agent = SupportAgent(self.llm, self.prompts)
+        self.opposition_agent = OppositionAgent(self.llm, self.prompts)
+        self.synthesizer_agent = SynthesizerAgent(self.llm, self.prompts)
+        self.context_compactor = ContextCompactor()
         self.logs_dir = Path(__file__).resolve().parents[1] / "logs"
-        self.log_file = self.logs_dir / "reasoning_logs.json"
+        self.log_file = self.logs_dir / "reasoning_logs.jsonl"
         self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.result_cache = self._build_result_cache()
+
+    def _build_result_cache(self) -> Optional[ResultCache]:
+        if os.getenv("AETHER_RESULT_CACHE", "1").lower() in ("0", "false", "no", "off"):
+            return None
+        disk_path = os.getenv("AETHER_RESULT_CACHE_DB", "").strip()
+        return ResultCache(
+            max_entries=int(os.getenv("AETHER_RESULT_CACHE_SIZE", "128")),
+            ttl_seconds=float(os.getenv("AETHER_RESULT_CACHE_TTL", "86400")),
+            disk_path=Path(disk_path) if disk_path else None,
+            disk_max_entries=int(os.getenv("AETHER_RESULT_CACHE_DB_MAX_ENTRIES", "5000")),
+        )
 
     def _calculate_confidence(self, debate_logs: List[DebateTrace], final_report: FinalReport) -> float:
         """Calculate confidence score based on debate analysis quality and balance."""
@@ -60,46 +101,133 @@ class AetherOrchestrator:
         avg_score = (total_score / factors_count) if factors_count > 0 else 0
         return round(min(avg_score, 100), 1)
 
-    async def analyze(self, context: ReasoningContext) -> Dict[str, Any]:
-        # 1) Factor extraction
-        factors: List[Factor] = await self.factor_extractor.extract_factors(context)
+    def pipeline_stats(self) -> Dict[str, Any]:
+        """Timings and queue depths of running analyses and of the last finished one."""
+        return {
+            "mode": self.pipeline_mode,
+            "active": [pipeline.snapshot() for pipeline in self._active_pipelines],
+            "last": self._last_pipeline.snapshot() if self._last_pipeline is not None else None,
+        }
 
-        # 2) For each factor → support then opposition
-        debate_logs: List[DebateTrace] = []
-        for factor in factors:
-            support: SupportArguments = await self.support_agent.generate_support(factor, context)
-            opposition: OppositionCounterArguments = await self.opposition_agent.generate_counters(
-                factor, support
-            )
+    async def analyze(
+        self,
+        context: ReasoningContext,
+        use_cache: bool = True,
+        on_event: Optional[EventCallback] = None,
+    ) -> Dict[str, Any]:
+        """Run the full pipeline and return the API response.
 
-            debate = DebateTrace(
-                factor_id=factor.factor_id,
-                factor=factor,
-                support=support,
-                opposition=opposition,
+        ``on_event`` is awaited as the pipeline advances, so streaming and
+        blocking callers share this one code path. Events, in order:
+
+        - ``stage``: ``{"stage": ...}`` when a stage starts (``debate`` also
+          carries ``total_factors``)
+        - ``factor``: ``{"factor": {...}}`` per factor while extraction streams
+        - ``factors``: ``{"factors": [...]}`` right after extraction
+        - ``debate_started``: ``{"factor_id": ...}``
+        - ``support_argument``: ``{"factor_id": ..., "argument": {...}}`` per
+          streamed support argument
+        - ``debate``: ``{"factor_id": ..., "debate": {...}}`` as soon as that
+          factor's opposition returns (completion order, not factor order)
+        - ``debate_error``: ``{"factor_id": ..., "error": ...}`` under the
+          ``partial`` failure policy
+        - ``result``: the full API response, last
+
+        The callback must not raise.
+
+        Runs in an ``analyze`` span: under the request's trace when there is
+        one, otherwise (jobs, batch items) as the root of its own trace.
+        """
+        # Models are serialized once per request; the memo is dropped when it ends
+        with span("analyze", **{"analyze.cache": use_cache}), serialization_scope():
+            return await self._analyze(context, use_cache, on_event)
+
+    async def _analyze(
+        self, context: ReasoningContext, use_cache: bool, on_event: Optional[EventCallback]
+    ) -> Dict[str, Any]:
+        emit = on_event or _ignore_event
+        # Dumped once for the cache key and the session log, which only read it
+        context_data = model_dict(context)
+
+        # 0) Identical inputs under the same model and prompts reuse the stored result
+        cache_key: Optional[str] = None
+        if self.result_cache is not None:
+            cache_key = ResultCache.make_key(
+                context_data, self.llm.model, self.prompts.versions()
             )
-            debate_logs.append(debate)
+            if use_cache:
+                cached = await self.result_cache.get(cache_key)
+                if cached is not None:
+                    current_span().set(**{"analyze.cache_hit": True})
+                    await emit("stage", {"stage": "cached"})
+                    if on_event is not None:
+                        await self._replay(cached, emit)
+                    return cached
 
-        # 3) Synthesis
-        final_report: FinalReport = await self.synthesizer_agent.generate_report(context, debate_logs)
+        # 1) Factor extraction → 2) support → opposition per factor → 3) synthesis,
+        # scheduled as a dataflow so each factor is debated as soon as it exists
+        pipeline = DebatePipeline(
+            self,
+            context,
+            emit,
+            mode=self.pipeline_mode,
+            workers=self.debate_concurrency,
+            queue_size=self.pipeline_queue_size,
+        )
+        self._active_pipelines.add(pipeline)
+        try:
+            factors, debate_logs, debate_errors, final_report = await pipeline.run()
+        finally:
+            self._active_pipelines.discard(pipeline)
+            self._last_pipeline = pipeline
 
         # Calculate confidence score based on debate balance
-        confidence_score = self._calculate_confidence(debate_logs, final_report)
+        with span("confidence", factors=len(debate_logs)) as confidence_span:
+            confidence_score = self._calculate_confidence(debate_logs, final_report)
+            confidence_span.set(score=confidence_score)
         final_report.confidence_score = confidence_score
 
+        # The log is written before the response is returned, so they can share these dicts
+        factors_data = [model_dict(f) for f in factors]
+        debates_data = [model_dict(d) for d in debate_logs]
+        report_data = model_dict(final_report)
+
         # 4) Persist logs (structured, readable)
+        await emit("stage", {"stage": "persisting"})
         session_log: Dict[str, Any] = {
             "timestamp": datetime.utcnow().isoformat() + "Z",
-            "input_context": context.dict(),
-            "factors": [f.dict() for f in factors],
-            "debate_logs": [d.dict() for d in debate_logs],
-            "final_report": final_report.dict(),
+            "input_context": context_data,
+            "factors": factors_data,
+            "debate_logs": debates_data,
+            "final_report": report_data,
         }
-        ReasoningLogger.save_session(session_log, self.log_file)
+        if debate_errors:
+            session_log["debate_errors"] = debate_errors
+        session_log["pipeline"] = pipeline.snapshot()
+        trace = current_trace()
+        if trace is not None:
+            session_log["trace"] = trace.summary()
+        with span("log.persist"):
+            await asyncio.to_thread(ReasoningLogger.save_session, session_log, self.log_file)
 
         # 5) API response
-        return {
-            "final_report": final_report.dict(),
-            "factors": [f.dict() for f in factors],
-            "debate_logs": [d.dict() for d in debate_logs],
+        response: Dict[str, Any] = {
+            "final_report": report_data,
+            "factors": factors_data,
+            "debate_logs": debates_data,
         }
+        if debate_errors:
+            response["debate_errors"] = debate_errors
+        elif cache_key is not None:
+            # Partial results are never cached; a bypassed request still refreshes the entry
+            await self.result_cache.set(cache_key, response)
+        await emit("result", response)
+        return response
+
+    @staticmethod
+    async def _replay(response: Dict[str, Any], emit: EventCallback) -> None:
+        """Emit the events of a finished analysis (used for cache hits)."""
+        await emit("factors", {"factors": response["factors"]})
+        for debate in response["debate_logs"]:
+            await emit("debate", {"factor_id": debate["factor_id"], "debate": debate})
+        await emit("result", response)
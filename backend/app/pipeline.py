@@ -0,0 +1,364 @@
+"""Dataflow scheduling of one analysis: extract → support → oppose → synthesize."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.schemas.context import ReasoningContext
+from app.schemas.debate import DebateTrace, OppositionCounterArguments, SupportArguments
+from app.schemas.factor import Factor
+from app.schemas.final_report import FinalReport
+from app.utils.compaction import ContextIndex, estimate_tokens
+from app.utils.serialization import model_dict, model_json
+from app.utils.tracing import span
+
+if TYPE_CHECKING:
+    from app.orchestrator import AetherOrchestrator
+
+PIPELINE_MODES = ("pipelined", "sequential")
+NODES = ("extract", "support", "oppose", "synthesize")
+
+# Async callback receiving (event name, payload) as the pipeline advances
+EventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# Marks the end of a queue's input; one is sent per downstream worker
+_DONE = object()
+
+
+async def _ignore_event(event: str, payload: Dict[str, Any]) -> None:
+    return None
+
+
+class DebatePipeline:
+    """
+    Runs the agents of one analysis as nodes connected by bounded queues.
+
+    In ``pipelined`` mode the extract node feeds factors into the support
+    queue as soon as they exist (with streaming, while later factors are still
+    being generated). ``workers`` support and ``workers`` oppose tasks drain
+    their queues, so each factor moves through its debate independently and
+    synthesis waits only on the join of all debates. A full queue applies
+    backpressure upstream.
+
+    ``sequential`` mode keeps the original behaviour for debugging: extract
+    everything, then debate factor by factor in order, then synthesize, with
+    no concurrency at all.
+
+    ``snapshot()`` reports per-node timings and current/peak queue depths and
+    can be called while the pipeline is running.
+    """
+
+    def __init__(
+        self,
+        orchestrator: "AetherOrchestrator",
+        context: ReasoningContext,
+        emit: EventCallback = _ignore_event,
+        mode: str = "pipelined",
+        workers: int = 6,
+        queue_size: int = 16,
+    ) -> None:
+        if mode not in PIPELINE_MODES:
+            raise ValueError(f"Pipeline mode must be one of {PIPELINE_MODES}, got {mode!r}")
+        self.orchestrator = orchestrator
+        self.context = context
+        self.emit = emit
+        self.mode = mode
+        self.workers = 1 if mode == "sequential" else max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.fail_fast = orchestrator.debate_failure_policy == "fail_fast"
+
+        self.factors: List[Factor] = []
+        self._results: Dict[int, DebateTrace] = {}
+        self._failures: Dict[int, BaseException] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._max_depth: Dict[str, int] = {}
+        self._index_task: Optional["asyncio.Task[Optional[ContextIndex]]"] = None
+        self._context_tokens: Dict[str, Any] = {"full": None, "support": [], "synthesis": None}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._nodes: Dict[str, Dict[str, Any]] = {
+            node: {"items": 0, "errors": 0, "busy_seconds": 0.0, "first_start": None, "last_end": None}
+            for node in NODES
+        }
+
+    async def run(self) -> Tuple[List[Factor], List[DebateTrace], List[Dict[str, Any]], FinalReport]:
+        """Return factors, debate logs (factor order), debate errors and the final report."""
+        self._started_at = time.perf_counter()
+        # Index the context for compaction while the factors are being extracted
+        self._index_task = asyncio.create_task(
+            asyncio.to_thread(self.orchestrator.context_compactor.build_index, self.context)
+        )
+        try:
+            if self.mode == "sequential":
+                await self._run_sequential()
+            else:
+                await self._run_pipelined()
+            debate_logs, debate_errors = await self._join()
+
+            await self.emit("stage", {"stage": "synthesis"})
+            final_report = await self._timed("synthesize", self._synthesize(debate_logs))
+            return self.factors, debate_logs, debate_errors, final_report
+        finally:
+            if not self._index_task.done():
+                self._index_task.cancel()
+            self._finished_at = time.perf_counter()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = self._finished_at or time.perf_counter()
+        nodes = {}
+        for name, node in self._nodes.items():
+            first_start, last_end = node["first_start"], node["last_end"]
+            nodes[name] = {
+                "items": node["items"],
+                "errors": node["errors"],
+                "busy_seconds": round(node["busy_seconds"], 4),
+                "wall_seconds": round(last_end - first_start, 4) if first_start and last_end else 0.0,
+                "first_start_offset": round(first_start - self._started_at, 4) if first_start else None,
+            }
+        queues = {
+            name: {"depth": queue.qsize(), "max_depth": self._max_depth[name], "maxsize": queue.maxsize}
+            for name, queue in self._queues.items()
+        }
+        support_tokens = self._context_tokens["support"]
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "running": self._finished_at is None,
+            "elapsed_seconds": round(now - self._started_at, 4) if self._started_at else 0.0,
+            "factors": len(self.factors),
+            "nodes": nodes,
+            "queues": queues,
+            "context_tokens": {
+                "full": self._context_tokens["full"],
+                "support_avg": round(sum(support_tokens) / len(support_tokens)) if support_tokens else None,
+                "synthesis": self._context_tokens["synthesis"],
+            },
+        }
+
+    async def _timed(self, node: str, awaitable: Awaitable[Any], **attributes: Any) -> Any:
+        start = time.perf_counter()
+        with span(f"pipeline.{node}", **attributes):
+            try:
+                result = await awaitable
+            except Exception:
+                self._record(node, start, items=1, errors=1)
+                raise
+        self._record(node, start, items=1)
+        return result
+
+    def _record(self, node: str, start: float, items: int = 0, errors: int = 0) -> None:
+        stats = self._nodes[node]
+        end = time.perf_counter()
+        if stats["first_start"] is None:
+            stats["first_start"] = start
+        stats["items"] += items
+        stats["errors"] += errors
+        stats["busy_seconds"] += end - start
+        stats["last_end"] = max(end, stats["last_end"] or end)
+
+    # Pipelined mode
+
+    async def _run_pipelined(self) -> None:
+        self._queues = {
+            "support": asyncio.Queue(maxsize=self.queue_size),
+            "oppose": asyncio.Queue(maxsize=self.queue_size),
+        }
+        self._max_depth = {name: 0 for name in self._queues}
+        support_workers_left = [self.workers]
+
+        async def put(queue_name: str, item: Any) -> None:
+            queue = self._queues[queue_name]
+            await queue.put(item)
+            self._max_depth[queue_name] = max(self._max_depth[queue_name], queue.qsize())
+
+        async def close(queue_name: str) -> None:
+            for _ in range(self.workers):
+                await self._queues[queue_name].put(_DONE)
+
+        async def extract_node() -> None:
+            async with aclosing(self._extract()) as factors:
+                async for index, factor in factors:
+                    await put("support", (index, factor))
+            await close("support")
+
+        async def support_node() -> None:
+            while True:
+                item = await self._queues["support"].get()
+                if item is _DONE:
+                    break
+                index, factor = item
+                try:
+                    support = await self._support(factor)
+                except Exception as e:
+                    self._fail(index, e)
+                    await self._report_failure(index, e)
+                    continue
+                await put("oppose", (index, factor, support))
+            support_workers_left[0] -= 1
+            if support_workers_left[0] == 0:
+                await close("oppose")
+
+        async def oppose_node() -> None:
+            while True:
+                item = await self._queues["oppose"].get()
+                if item is _DONE:
+                    break
+                index, factor, support = item
+                try:
+                    await self._oppose(index, factor, support)
+                except Exception as e:
+                    self._fail(index, e)
+                    await self._report_failure(index, e)
+
+        tasks = [asyncio.create_task(extract_node())]
+        tasks += [asyncio.create_task(support_node()) for _ in range(self.workers)]
+        tasks += [asyncio.create_task(oppose_node()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # An extraction failure, or any debate failure under fail_fast
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    # Sequential (deterministic) mode
+
+    async def _run_sequential(self) -> None:
+        pending = [item async for item in self._extract(streaming=False)]
+        for index, factor in pending:
+            try:
+                support = await self._support(factor)
+                await self._oppose(index, factor, support)
+            except Exception as e:
+                self._fail(index, e)
+                await self._report_failure(index, e)
+
+    # Node bodies shared by both modes
+
+    async def _extract(self, streaming: Optional[bool] = None) -> AsyncIterator[Tuple[int, Factor]]:
+        orchestrator = self.orchestrator
+        streaming = orchestrator.llm_streaming if streaming is None else streaming
+        await self.emit("stage", {"stage": "factor_extraction"})
+
+        if streaming:
+            # Busy time covers waiting on the model, not time blocked on a full queue
+            async with aclosing(orchestrator.factor_extractor.stream_factors(self.context)) as stream:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        factor = await stream.__anext__()
+                    except StopAsyncIteration:
+                        self._record("extract", start)
+                        break
+                    except Exception:
+                        self._record("extract", start, errors=1)
+                        raise
+                    self._record("extract", start, items=1)
+                    self.factors.append(factor)
+                    if self.emit is not _ignore_event:
+                        await self.emit("factor", {"factor": model_dict(factor)})
+                    yield len(self.factors) - 1, factor
+            await self._announce_factors()
+        else:
+            start = time.perf_counter()
+            try:
+                self.factors = await orchestrator.factor_extractor.extract_factors(self.context)
+            except Exception:
+                self._record("extract", start, errors=1)
+                raise
+            self._record("extract", start, items=len(self.factors))
+            await self._announce_factors()
+            for index, factor in enumerate(self.factors):
+                yield index, factor
+
+    async def _announce_factors(self) -> None:
+        if self.emit is not _ignore_event:
+            await self.emit("factors", {"factors": [model_dict(f) for f in self.factors]})
+        await self.emit("stage", {"stage": "debate", "total_factors": len(self.factors)})
+
+    async def _support(self, factor: Factor) -> SupportArguments:
+        await self.emit("debate_started", {"factor_id": factor.factor_id})
+        return await self._timed("support", self._generate_support(factor), factor_id=factor.factor_id)
+
+    async def _compacted(self, query: str, budget: int) -> ReasoningContext:
+        """The slice of the context most relevant to ``query`` within ``budget`` tokens."""
+        index = await self._index_task
+        if self._context_tokens["full"] is None:
+            self._context_tokens["full"] = (
+                index.full_tokens if index is not None else estimate_tokens(model_json(self.context))
+            )
+        if index is None:
+            return self.context
+        return index.compact(query, budget)
+
+    async def _generate_support(self, factor: Factor) -> SupportArguments:
+        support_agent = self.orchestrator.support_agent
+        context = await self._compacted(
+            factor.description, self.orchestrator.context_compactor.support_budget
+        )
+        self._context_tokens["support"].append(estimate_tokens(model_json(context)))
+        if not self.orchestrator.llm_streaming:
+            return await support_agent.generate_support(factor, context)
+
+        arguments = []
+        async with aclosing(support_agent.stream_support(factor, context)) as stream:
+            async for argument in stream:
+                arguments.append(argument)
+                if self.emit is not _ignore_event:
+                    await self.emit(
+                        "support_argument", {"factor_id": factor.factor_id, "argument": model_dict(argument)}
+                    )
+        return SupportArguments(support_arguments=arguments)
+
+    async def _oppose(self, index: int, factor: Factor, support: SupportArguments) -> None:
+        opposition: OppositionCounterArguments = await self._timed(
+            "oppose", self.orchestrator.opposition_agent.generate_counters(factor, support),
+            factor_id=factor.factor_id,
+        )
+        debate = DebateTrace(
+            factor_id=factor.factor_id,
+            factor=factor,
+            support=support,
+            opposition=opposition,
+        )
+        self._results[index] = debate
+        if self.emit is not _ignore_event:
+            await self.emit("debate", {"factor_id": factor.factor_id, "debate": model_dict(debate)})
+
+    async def _synthesize(self, debate_logs: List[DebateTrace]) -> FinalReport:
+        # The synthesis context is ranked against every debated factor and its claims
+        query = " ".join(
+            [debate.factor.description for debate in debate_logs]
+            + [argument.claim for debate in debate_logs for argument in debate.support.support_arguments]
+            + [counter.challenge for debate in debate_logs for counter in debate.opposition.counter_arguments]
+        )
+        context = await self._compacted(query, self.orchestrator.context_compactor.synthesis_budget)
+        self._context_tokens["synthesis"] = estimate_tokens(model_json(context))
+        return await self.orchestrator.synthesizer_agent.generate_report(context, debate_logs)
+
+    def _fail(self, index: int, error: Exception) -> None:
+        if self.fail_fast:
+            raise error
+        self._failures[index] = error
+
+    async def _report_failure(self, index: int, error: Exception) -> None:
+        await self.emit("debate_error", self._error_entry(index, error))
+
+    def _error_entry(self, index: int, error: BaseException) -> Dict[str, Any]:
+        return {
+            "factor_id": self.factors[index].factor_id,
+            "error": getattr(error, "detail", None) or str(error),
+        }
+
+    async def _join(self) -> Tuple[List[DebateTrace], List[Dict[str, Any]]]:
+        """Collect debates in factor order; raise if every factor failed."""
+        debate_logs = [self._results[i] for i in sorted(self._results)]
+        debate_errors = [self._error_entry(i, self._failures[i]) for i in sorted(self._failures)]
+        if not debate_logs and self._failures:
+            raise self._failures[min(self._failures)]
+        return debate_logs, debate_errors
+
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from app.schemas.context import ReasoningContext
+
+
+class BatchRequest(BaseModel):
+    contexts: List[ReasoningContext] = Field(..., min_length=1, description="Contexts to analyze")
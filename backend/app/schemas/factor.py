@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 from enum import Enum
+from typing import List
+
 from pydantic import BaseModel, Field
 
 
@@ -15,3 +17,7 @@ class Factor(BaseModel):
     factor_id: str = Field(..., description="Identifier like F1, F2, ...")
     description: str
     domain: DomainEnum
+
+
+class FactorList(BaseModel):
+    factors: List[Factor] = Field(default_factory=list)
@@ -0,0 +1,173 @@
+"""Caching primitives: an in-memory LRU tier and the analysis result cache."""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterator, Optional, Tuple
+
+import orjson
+
+from app.utils.metrics import record_cache
+from app.utils.serialization import dumps
+
+
+class LRUCache:
+    """Bounded LRU mapping with an optional per-entry time-to-live.
+
+    Intended for use from the event loop thread; it performs no locking.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds if ttl_seconds and ttl_seconds > 0 else None
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if self.ttl_seconds is not None and time.time() - stored_at > self.ttl_seconds:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.time(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+def canonical_json(data: Any) -> str:
+    """Serialize ``data`` deterministically (sorted keys, no whitespace)."""
+    return orjson.dumps(data, default=str, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+
+
+class ResultCache:
+    """Content-addressed cache of full analysis results.
+
+    Entries are keyed by a hash of the canonical ``ReasoningContext`` together
+    with the model name and prompt template versions, so any change to the
+    inputs or prompts produces a new key. Lookups hit an in-memory LRU first
+    and then an optional SQLite file that survives restarts. Both tiers
+    honour the TTL; the disk tier is trimmed to ``disk_max_entries`` by last
+    access time.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        ttl_seconds: Optional[float] = None,
+        disk_path: Optional[Path] = None,
+        disk_max_entries: int = 5000,
+    ) -> None:
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.ttl_seconds = self.memory.ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_entries = max(1, disk_max_entries)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_path is not None:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+                )
+
+    @staticmethod
+    def make_key(context: Dict[str, Any], model: str, prompt_versions: Dict[str, str]) -> str:
+        payload = canonical_json({"context": context, "model": model, "prompts": prompt_versions})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.disk_path is not None:
+            value = await asyncio.to_thread(self._disk_get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+
+        record_cache("result", value is not None)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        value = copy.deepcopy(value)
+        self.memory.set(key, value)
+        if self.disk_path is not None:
+            await asyncio.to_thread(self._disk_set, key, dumps(value))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_evictions": self.memory.evictions,
+            "disk_enabled": self.disk_path is not None,
+        }
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.disk_path), timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        return orjson.loads(row[0])
+
+    def _disk_set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if self.ttl_seconds is not None:
+                conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM results WHERE key NOT IN ("
+                "SELECT key FROM results ORDER BY accessed_at DESC LIMIT ?)",
+                (self.disk_max_entries,),
+            )
@@ -0,0 +1,228 @@
+"""Per-factor context compaction with a local BM25 index over narrative chunks and metrics."""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.schemas.context import Metric, ReasoningContext
+from app.utils.serialization import model_json
+
+_WORD = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "will with we our their they than then there these those which who what when where how not "
+    "but if into over under per vs via".split()
+)
+
+# Marks a gap between non-adjacent narrative chunks in a compacted context
+CHUNK_GAP = "\n[...]\n"
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token, matching LLMClient's quota estimate
+    return len(text) // 4 + 1
+
+
+def tokenize(text: str, min_length: int = 2) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) >= min_length]
+
+
+def chunk_narrative(text: str, chunk_tokens: int) -> List[str]:
+    """Split text into chunks of about ``chunk_tokens``, breaking at paragraphs, then sentences."""
+    max_chars = max(1, chunk_tokens) * 4
+    pieces: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                pieces.append(sentence)
+
+    # Greedily merge small pieces so chunks carry enough context to score well
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(piece) + 1 <= max_chars:
+            chunks[-1] = f"{chunks[-1]}\n{piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def overlapping_chunks(text: str, chunk_tokens: int, overlap_tokens: int) -> List[str]:
+    """Split text into windows of about ``chunk_tokens`` that share ~``overlap_tokens`` with the previous one."""
+    pieces = chunk_narrative(text, max(25, min(200, chunk_tokens // 4)))
+    costs = [estimate_tokens(piece) for piece in pieces]
+    windows: List[str] = []
+    start = 0
+    while start < len(pieces):
+        end, size = start, 0
+        while end < len(pieces) and (end == start or size + costs[end] <= chunk_tokens):
+            size += costs[end]
+            end += 1
+        windows.append("\n".join(pieces[start:end]))
+        if end >= len(pieces):
+            break
+        # Step back over trailing pieces so the next window repeats ~overlap_tokens
+        next_start, overlap = end, 0
+        while next_start - 1 > start and overlap + costs[next_start - 1] <= overlap_tokens:
+            next_start -= 1
+            overlap += costs[next_start]
+        start = next_start
+    return windows
+
+
+class BM25:
+    """Okapi BM25 over pre-tokenized documents."""
+
+    def __init__(self, documents: Sequence[List[str]], k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freq: Counter = Counter()
+        for freqs in self.term_freqs:
+            doc_freq.update(freqs.keys())
+        n = len(documents)
+        self.idf: Dict[str, float] = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()
+        }
+
+    def scores(self, query: Iterable[str]) -> List[float]:
+        terms = [term for term in set(query) if term in self.idf]
+        results = []
+        for freqs, length in zip(self.term_freqs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+def _metric_text(metric: Metric) -> str:
+    return f"{metric.name} {metric.region or ''} {metric.value}"
+
+
+def _top(scores: Sequence[float], costs: Sequence[int], budget: int, limit: int) -> Tuple[List[int], int]:
+    """Best-scoring indices (ties keep document order) that fit ``budget``; returns them and the cost used."""
+    chosen: List[int] = []
+    used = 0
+    for index in sorted(range(len(scores)), key=lambda i: (-scores[i], i)):
+        if len(chosen) >= limit:
+            break
+        if used + costs[index] > budget:
+            continue
+        chosen.append(index)
+        used += costs[index]
+    return sorted(chosen), used
+
+
+class ContextIndex:
+    """
+    Lexical index over one ``ReasoningContext``, built once per analysis.
+
+    ``compact(query, budget)`` returns a copy of the context whose narrative
+    is the top-k chunks most relevant to ``query`` (kept in document order,
+    gaps marked with ``[...]``) and whose metrics are the top-k relevant
+    metrics, all within ``budget`` estimated tokens. Facts, assumptions and
+    limitations are kept whole. A context that already fits is returned
+    unchanged, so small documents produce exactly the same prompts as before.
+    """
+
+    def __init__(
+        self,
+        context: ReasoningContext,
+        chunk_tokens: int = 200,
+        top_k_chunks: int = 12,
+        top_k_metrics: int = 25,
+    ) -> None:
+        self.context = context
+        self.top_k_chunks = max(1, top_k_chunks)
+        self.top_k_metrics = max(0, top_k_metrics)
+        self.full_tokens = estimate_tokens(model_json(context))
+
+        self.chunks = chunk_narrative(context.narrative, chunk_tokens)
+        self.chunk_costs = [estimate_tokens(chunk) + 2 for chunk in self.chunks]
+        self.chunk_index = BM25([tokenize(chunk) for chunk in self.chunks])
+
+        self.metric_costs = [estimate_tokens(metric.model_dump_json()) for metric in context.metrics]
+        self.metric_index = BM25([tokenize(_metric_text(metric)) for metric in context.metrics])
+
+        fixed = context.model_copy(update={"narrative": "", "metrics": []})
+        self.fixed_tokens = estimate_tokens(fixed.model_dump_json())
+
+    def compact(self, query: str, budget: int) -> ReasoningContext:
+        if self.full_tokens <= budget:
+            return self.context
+
+        terms = tokenize(query)
+        available = max(0, budget - self.fixed_tokens)
+        # Narrative gets most of the budget; metrics take the rest plus whatever it leaves unused
+        chunk_ids, used = _top(
+            self.chunk_index.scores(terms), self.chunk_costs, int(available * 0.7), self.top_k_chunks
+        )
+        metric_ids, _ = _top(
+            self.metric_index.scores(terms), self.metric_costs, available - used, self.top_k_metrics
+        )
+
+        narrative_parts: List[str] = []
+        previous = -1
+        for index in chunk_ids:
+            if index != previous + 1:
+                narrative_parts.append(CHUNK_GAP)
+            elif narrative_parts:
+                narrative_parts.append("\n")
+            narrative_parts.append(self.chunks[index])
+            previous = index
+        if previous != len(self.chunks) - 1:
+            narrative_parts.append(CHUNK_GAP)
+
+        return self.context.model_copy(update={
+            "narrative": "".join(narrative_parts),
+            "metrics": [self.context.metrics[i] for i in metric_ids],
+        })
+
+
+class ContextCompactor:
+    """
+    Settings for per-factor context compaction, read once from the environment.
+
+    ``AETHER_CONTEXT_COMPACTION`` (default on) enables it,
+    ``AETHER_SUPPORT_TOKEN_BUDGET`` and ``AETHER_SYNTHESIS_TOKEN_BUDGET`` cap the
+    context embedded in support and synthesis prompts, and
+    ``AETHER_CONTEXT_CHUNK_TOKENS`` / ``AETHER_CONTEXT_TOP_K_CHUNKS`` /
+    ``AETHER_CONTEXT_TOP_K_METRICS`` shape the selection.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = os.getenv("AETHER_CONTEXT_COMPACTION", "1").lower() not in ("0", "false", "no", "off")
+        self.support_budget = int(os.getenv("AETHER_SUPPORT_TOKEN_BUDGET", "2000"))
+        self.synthesis_budget = int(os.getenv("AETHER_SYNTHESIS_TOKEN_BUDGET", "4000"))
+        self.chunk_tokens = int(os.getenv("AETHER_CONTEXT_CHUNK_TOKENS", "200"))
+        self.top_k_chunks = int(os.getenv("AETHER_CONTEXT_TOP_K_CHUNKS", "12"))
+        self.top_k_metrics = int(os.getenv("AETHER_CONTEXT_TOP_K_METRICS", "25"))
+
+    def build_index(self, context: ReasoningContext) -> Optional[ContextIndex]:
+        """Index ``context``; None when compaction is disabled or the context is already small."""
+        if not self.enabled:
+            return None
+        if estimate_tokens(model_json(context)) <= min(self.support_budget, self.synthesis_budget):
+            return None
+        return ContextIndex(context, self.chunk_tokens, self.top_k_chunks, self.top_k_metrics)
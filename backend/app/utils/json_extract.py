@@ -0,0 +1,144 @@
+"""Locate and parse the JSON object in free-form LLM output in a single pass."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_FENCE = "```"
+_CLOSERS = {"{": "}", "[": "]"}
+_WHITESPACE = " \t\r\n"
+
+
+def _fenced(text: str) -> Optional[str]:
+    """Body of the first Markdown code fence; an unterminated fence runs to the end of the text."""
+    start = text.find(_FENCE)
+    if start < 0:
+        return None
+    body_start = text.find("\n", start)
+    if body_start < 0:
+        return None
+    end = text.find(_FENCE, body_start)
+    return text[body_start + 1:end if end >= 0 else len(text)]
+
+
+def _assemble(text: str, start: int, end: int, dropped: List[int], closers: str = "") -> str:
+    parts = []
+    position = start
+    for index in dropped:
+        if start <= index < end:
+            parts.append(text[position:index])
+            position = index + 1
+    parts.append(text[position:end])
+    parts.append(closers)
+    return "".join(parts)
+
+
+def _candidates(text: str) -> Iterator[str]:
+    """
+    Yield the JSON text of each top-level object in ``text``.
+
+    Strings and escapes are tracked so braces inside them are ignored, and
+    commas directly before ``}``/``]`` are dropped. A ``{`` whose next
+    character cannot start a key (as in prose) is abandoned and scanning
+    resumes from that character, so every character is visited once. If the
+    text ends inside an object, the object is cut at the last point where it
+    was complete (after a closed container, or before a comma in an array or
+    the outermost object, so a half-written array element is dropped whole)
+    and its open containers are closed.
+    """
+    stack: List[str] = []
+    start = 0
+    in_string = escape = expect_key = False
+    last_sig = -1  # index of the last significant character outside strings
+    dropped: List[int] = []
+    safe: Optional[Tuple[int, str]] = None
+
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if not stack:
+            if c == "{":
+                stack, start, expect_key, last_sig = ["{"], i, True, i
+                dropped, safe = [], None
+            i += 1
+            continue
+
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                last_sig = i
+            i += 1
+            continue
+
+        if c in _WHITESPACE:
+            i += 1
+            continue
+
+        if expect_key:
+            expect_key = False
+            if c != '"' and c != "}":
+                # Not JSON after all: rescan this character as ordinary text
+                stack = []
+                continue
+
+        if c == '"':
+            in_string = True
+        elif c == "{" or c == "[":
+            stack.append(c)
+            expect_key = c == "{"
+        elif c == "}" or c == "]":
+            if text[last_sig] == ",":
+                dropped.append(last_sig)
+            stack.pop()
+            if not stack:
+                yield _assemble(text, start, i + 1, dropped)
+            else:
+                safe = (i + 1, "".join(_CLOSERS[o] for o in reversed(stack)))
+        elif c == ",":
+            if len(stack) == 1 or stack[-1] == "[":
+                safe = (i, "".join(_CLOSERS[o] for o in reversed(stack)))
+            expect_key = stack[-1] == "{"
+        last_sig = i
+        i += 1
+
+    if stack and safe is not None:
+        yield _assemble(text, start, safe[0], dropped, safe[1])
+
+
+def extract_json(text: str) -> Dict[str, Any]:
+    """
+    Parse the JSON object an LLM returned, tolerating the usual noise.
+
+    Tries, in order: the whole text, the body of a Markdown code fence, then
+    each top-level ``{...}`` found by a single brace-aware scan (trailing
+    commas removed, truncated output closed at its last complete value).
+    Raises ``ValueError`` when no candidate parses to an object.
+    """
+    text = text.strip()
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+
+    sources = [text]
+    fenced = _fenced(text)
+    if fenced is not None:
+        sources.insert(0, fenced)
+
+    for source in sources:
+        for candidate in _candidates(source):
+            try:
+                data = json.loads(candidate)
+            except ValueError:
+                continue
+            if isinstance(data, dict):
+                return data
+
+    raise ValueError("No valid JSON object found in LLM output")
@@ -0,0 +1,120 @@
+"""Incremental parsing of JSON objects streamed token by token from the LLM."""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class JsonArrayStreamParser:
+    """
+    Yields the elements of one array inside a streamed JSON object as they close.
+
+    For output shaped like ``{"factors":[{...},{...}]}`` and ``key="factors"``,
+    every call to ``feed`` returns the objects of that array whose closing
+    brace arrived in the chunk, so callers can act on ``F1`` while ``F2`` is
+    still being generated. The scanner is single-pass: each chunk is scanned
+    once when fed, only the element being read is buffered, and braces
+    inside strings are ignored.
+    Text around the object (code fences, prose) is skipped.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        # Chunks are kept as a list and joined on demand: appending to one
+        # growing string would copy the whole output on every chunk
+        self._chunks: List[str] = []
+        self._text: Optional[str] = ""
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._array_closed = False
+        self._in_element = False
+        # Text of the string or element being read: earlier chunks, and where it starts in this one
+        self._captured: List[str] = []
+        self._capture_start: Optional[int] = None
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        if self._text is None:
+            self._text = "".join(self._chunks)
+            self._chunks = [self._text]
+        return self._text
+
+    def _capture(self, chunk: str, end: int) -> str:
+        text = "".join(self._captured) + chunk[self._capture_start:end]
+        self._captured = []
+        self._capture_start = None
+        return text
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._chunks.append(chunk)
+        self._text = None
+        completed: List[Dict[str, Any]] = []
+
+        for i, c in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if not self._in_element:
+                        self._last_string = self._capture(chunk, i)
+            elif c == '"':
+                self._in_string = True
+                if not self._in_element:
+                    self._capture_start = i + 1
+            elif c == ":":
+                if len(self._stack) == 1:
+                    self._current_key = self._last_string
+            elif c == "{" or c == "[":
+                if (
+                    c == "["
+                    and not self._array_closed
+                    and self._array_depth is None
+                    and self._stack == ["{"]
+                    and self._current_key == self.key
+                ):
+                    self._array_depth = 2
+                elif (
+                    c == "{"
+                    and self._array_depth is not None
+                    and len(self._stack) == self._array_depth
+                ):
+                    self._in_element = True
+                    self._capture_start = i
+                self._stack.append(c)
+            elif c == "}" or c == "]":
+                if self._stack:
+                    self._stack.pop()
+                if (
+                    c == "}"
+                    and self._in_element
+                    and len(self._stack) == self._array_depth
+                ):
+                    self._in_element = False
+                    try:
+                        element = json.loads(self._capture(chunk, i + 1))
+                        if isinstance(element, dict):
+                            completed.append(element)
+                    except ValueError:
+                        pass
+                elif (
+                    c == "]"
+                    and self._array_depth is not None
+                    and len(self._stack) == self._array_depth - 1
+                ):
+                    self._array_depth = None
+                    self._array_closed = True
+
+        if self._capture_start is not None:
+            # The string or element continues in the next chunk
+            self._captured.append(chunk[self._capture_start:])
+            self._capture_start = 0
+        return completed
@@ -0,0 +1,358 @@
+"""LLM backends behind ``LLMClient``: Gemini on Vertex AI and an offline fake for benchmarks."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import random
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+from app.utils.serialization import dumps
+
+BACKENDS = ("gemini", "fake")
+
+
+class LLMResponse:
+    """Text of one completion and, when the backend reports it, the tokens it used."""
+
+    def __init__(self, text: str, total_tokens: Optional[int] = None) -> None:
+        self.text = text
+        self.total_tokens = total_tokens
+
+
+class LLMBackend:
+    """
+    What ``LLMClient`` needs from a model provider.
+
+    ``generate`` returns one ``LLMResponse``; ``stream`` yields text chunks
+    and by default yields the whole completion at once. Errors should carry
+    an HTTP-like ``code`` (or a gRPC ``status``) so the rate limiter can tell
+    throttling and transient failures from permanent ones.
+    """
+
+    name = "base"
+
+    async def generate(self, model: str, contents: str, config: Dict[str, Any]) -> LLMResponse:
+        raise NotImplementedError
+
+    async def stream(self, model: str, contents: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        response = await self.generate(model, contents, config)
+        yield response.text
+
+    def close(self) -> None:
+        pass
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Gemini through ``google-genai`` on Vertex AI (OAuth / ADC).
+
+    The SDK's native async API is used for ``generate`` when available
+    (``AETHER_LLM_EXECUTION=auto``), otherwise blocking calls run in a thread
+    pool of ``max_workers``. Streams always run in that pool.
+    """
+
+    name = "gemini"
+
+    def __init__(self, max_workers: int) -> None:
+        from google import genai
+
+        self.max_workers = max_workers
+        # "auto" prefers the native async API, "thread" forces the thread pool
+        self.execution_mode = os.getenv("AETHER_LLM_EXECUTION", "auto").lower()
+
+        self.client = genai.Client(
+            vertexai=True,                    # 🔑 THIS IS REQUIRED
+            project=os.getenv("GCP_PROJECT"), # optional but recommended
+            location=os.getenv("GCP_LOCATION", "us-central1"),
+        )
+
+        aio = getattr(self.client, "aio", None)
+        self._aio_models = getattr(aio, "models", None) if self.execution_mode != "thread" else None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="aether-llm"
+            )
+        return self._executor
+
+    @staticmethod
+    def _response(response: Any) -> LLMResponse:
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None)
+        return LLMResponse(response.text or "", total if isinstance(total, int) else None)
+
+    async def generate(self, model: str, contents: str, config: Dict[str, Any]) -> LLMResponse:
+        if self._aio_models is not None:
+            return self._response(await self._aio_models.generate_content(
+                model=model, contents=contents, config=config
+            ))
+
+        loop = asyncio.get_running_loop()
+        return self._response(await loop.run_in_executor(
+            self._get_executor(),
+            lambda: self.client.models.generate_content(model=model, contents=contents, config=config),
+        ))
+
+    async def stream(self, model: str, contents: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        # The SDK's async stream reads the HTTP response with blocking
+        # ``iter_lines()`` on the loop thread, so the sync stream is drained
+        # in the thread pool instead and its chunks handed over via a queue
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def put(item: Tuple[Optional[str], Optional[BaseException]]) -> None:
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:  # loop already closed; nobody is listening
+                stop.set()
+
+        def pump() -> None:
+            try:
+                for chunk in self.client.models.generate_content_stream(
+                    model=model, contents=contents, config=config
+                ):
+                    if stop.is_set():
+                        return
+                    text = getattr(chunk, "text", None)
+                    if text:
+                        put((text, None))
+                put((None, None))
+            except BaseException as e:
+                put((None, e))
+
+        loop.run_in_executor(self._get_executor(), pump)
+        try:
+            while True:
+                text, error = await chunks.get()
+                if error is not None:
+                    raise error
+                if text is None:
+                    return
+                yield text
+        finally:
+            # Stops the worker at its next chunk when the consumer leaves early
+            stop.set()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class InjectedFailure(Exception):
+    """Error raised by ``FakeBackend``; looks like a Vertex AI 429 or 503 to the rate limiter."""
+
+    def __init__(self, code: int, status: str) -> None:
+        super().__init__(f"{code} {status} (injected by the fake LLM backend)")
+        self.code = code
+        self.status = status
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Sampler for a latency spec in seconds.
+
+    ``fixed:S``, ``uniform:LOW,HIGH``, ``normal:MEAN,STDDEV``,
+    ``lognormal:MEDIAN,SIGMA`` or ``exponential:MEAN``; a bare number means
+    ``fixed``. Samples are never negative.
+    """
+    kind, _, raw = spec.strip().partition(":")
+    if not raw:
+        kind, raw = "fixed", kind
+    try:
+        args = [float(value) for value in raw.split(",")]
+        if kind == "fixed" and len(args) == 1:
+            return lambda rng: max(0.0, args[0])
+        if kind == "uniform" and len(args) == 2:
+            return lambda rng: max(0.0, rng.uniform(args[0], args[1]))
+        if kind == "normal" and len(args) == 2:
+            return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+        if kind == "lognormal" and len(args) == 2 and args[0] > 0:
+            mu = math.log(args[0])
+            return lambda rng: rng.lognormvariate(mu, args[1])
+        if kind == "exponential" and len(args) == 1 and args[0] > 0:
+            return lambda rng: rng.expovariate(1.0 / args[0])
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency spec {spec!r}")
+
+
+_DOMAINS = ("sales", "statistics", "policy", "organization")
+_TOPICS = (
+    "regional revenue", "customer churn", "commission structure", "sales velocity", "pipeline coverage",
+    "CRM adoption", "pricing pressure", "team productivity", "forecast accuracy", "deal size",
+    "market entry", "data quality", "hiring plan", "payroll cost", "renewal rate",
+)
+# Marker in each prompt template -> kind of canned answer
+_MARKERS = (
+    ("JSON repair assistant", "repair"),
+    ("You are the Factor Extractor Agent", "factors"),
+    ("You are the Support Agent", "support"),
+    ("You are the Opposition Agent", "opposition"),
+    ("You are the Synthesizer Agent", "report"),
+)
+# Schema title in a repair prompt -> kind of canned answer
+_SCHEMA_KINDS = {
+    "FactorList": "factors",
+    "SupportArguments": "support",
+    "OppositionCounterArguments": "opposition",
+    "FinalReport": "report",
+}
+_FACTOR_ID = re.compile(r'"factor_id":\s*"([^"]+)"')
+_SCHEMA_TITLE = re.compile(r'"title":"(\w+)"')
+
+
+class FakeBackend(LLMBackend):
+    """
+    Offline stand-in that answers every agent with schema-valid canned JSON.
+
+    Used for benchmarks and load tests without Vertex AI credentials. The
+    agent is recognized from its prompt template; the factor extractor
+    returns ``AETHER_FAKE_FACTORS`` factors. ``AETHER_FAKE_LATENCY`` is a
+    latency distribution (see ``parse_latency``) sampled per call; streamed
+    answers arrive in ``AETHER_FAKE_STREAM_CHUNK_CHARS`` chunks spread over
+    that latency. ``AETHER_FAKE_THROTTLE_RATE`` and
+    ``AETHER_FAKE_FAILURE_RATE`` inject 429 and 503 errors, and
+    ``AETHER_FAKE_MALFORMED_RATE`` wraps answers in prose and cuts them off
+    to exercise JSON recovery. Randomness comes from ``AETHER_FAKE_SEED``.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        factors: Optional[int] = None,
+        latency: Optional[str] = None,
+        throttle_rate: Optional[float] = None,
+        failure_rate: Optional[float] = None,
+        malformed_rate: Optional[float] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.factors = factors if factors is not None else int(os.getenv("AETHER_FAKE_FACTORS", "4"))
+        self.latency_spec = latency or os.getenv("AETHER_FAKE_LATENCY", "fixed:0")
+        self.sample_latency = parse_latency(self.latency_spec)
+        self.throttle_rate = throttle_rate if throttle_rate is not None else float(
+            os.getenv("AETHER_FAKE_THROTTLE_RATE", "0")
+        )
+        self.failure_rate = failure_rate if failure_rate is not None else float(
+            os.getenv("AETHER_FAKE_FAILURE_RATE", "0")
+        )
+        self.malformed_rate = malformed_rate if malformed_rate is not None else float(
+            os.getenv("AETHER_FAKE_MALFORMED_RATE", "0")
+        )
+        self.chunk_chars = max(1, int(os.getenv("AETHER_FAKE_STREAM_CHUNK_CHARS", "16")))
+        self.rng = random.Random(seed if seed is not None else int(os.getenv("AETHER_FAKE_SEED", "0")))
+        self.counts: Dict[str, int] = {"calls": 0, "throttled": 0, "failed": 0, "malformed": 0}
+
+    @staticmethod
+    def _kind(contents: str) -> str:
+        found = [(contents.find(marker), kind) for marker, kind in _MARKERS if marker in contents]
+        if not found:
+            return "report"
+        kind = min(found)[1]
+        if kind == "repair":
+            titles = [title for title in _SCHEMA_TITLE.findall(contents) if title in _SCHEMA_KINDS]
+            kind = _SCHEMA_KINDS[titles[0]] if titles else "report"
+        return kind
+
+    def _answer(self, kind: str, contents: str) -> str:
+        match = _FACTOR_ID.search(contents)
+        factor_id = match.group(1) if match else "F1"
+        if kind == "factors":
+            return dumps({"factors": [
+                {
+                    "factor_id": f"F{i}",
+                    "description": f"Synthetic factor {i}: {_TOPICS[(i - 1) % len(_TOPICS)]} trend {i}",
+                    "domain": _DOMAINS[(i - 1) % len(_DOMAINS)],
+                }
+                for i in range(1, max(1, self.factors) + 1)
+            ]})
+        if kind == "support":
+            return dumps({"support_arguments": [
+                {
+                    "claim": f"{factor_id} is backed by the reported figures ({n}).",
+                    "evidence": f"The context lists metrics consistent with {factor_id}.",
+                    "assumption": "The reported figures are complete.",
+                }
+                for n in (1, 2)
+            ]})
+        if kind == "opposition":
+            return dumps({"counter_arguments": [
+                {
+                    "target_claim": f"{factor_id} is backed by the reported figures ({n}).",
+                    "challenge": "The figures cover a single quarter.",
+                    "risk": "Seasonality may explain the change.",
+                }
+                for n in (1, 2)
+            ]})
+        return dumps({
+            "what_worked": "Sales velocity improved after the commission change.",
+            "what_failed": "Regional revenue missed target.",
+            "why_it_happened": "Competitive pricing pressure and delayed data.",
+            "how_to_improve": "Focus on the lagging region and fix data quality.",
+            "synthesis": "Growth is real but uneven across regions.",
+            "recommendation": "Prioritize retention and regional recovery.",
+        })
+
+    def _malform(self, text: str) -> str:
+        # Prose and a code fence around output cut at 80%: recoverable by the extractor or a repair call
+        return f"Here is the analysis you asked for:\n```json\n{text[:int(len(text) * 0.8)]}"
+
+    def _prepare(self, contents: str) -> Tuple[float, Union[str, Exception]]:
+        """Latency, answer text or the error to raise for one call."""
+        self.counts["calls"] += 1
+        latency = self.sample_latency(self.rng)
+        roll = self.rng.random()
+        if roll < self.throttle_rate:
+            self.counts["throttled"] += 1
+            return latency, InjectedFailure(429, "RESOURCE_EXHAUSTED")
+        if roll < self.throttle_rate + self.failure_rate:
+            self.counts["failed"] += 1
+            return latency, InjectedFailure(503, "UNAVAILABLE")
+        text = self._answer(self._kind(contents), contents)
+        # Repair answers stay well-formed so every malformed answer costs exactly one repair
+        if "JSON repair assistant" not in contents and self.rng.random() < self.malformed_rate:
+            self.counts["malformed"] += 1
+            text = self._malform(text)
+        return latency, text
+
+    async def generate(self, model: str, contents: str, config: Dict[str, Any]) -> LLMResponse:
+        latency, answer = self._prepare(contents)
+        await asyncio.sleep(latency)
+        if isinstance(answer, Exception):
+            raise answer
+        return LLMResponse(answer, len(contents) // 4 + len(answer) // 4)
+
+    async def stream(self, model: str, contents: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        latency, answer = self._prepare(contents)
+        # A fifth of the latency before the first chunk, the rest spread over the chunks
+        await asyncio.sleep(latency * 0.2)
+        if isinstance(answer, Exception):
+            raise answer
+        chunks: List[str] = [answer[i:i + self.chunk_chars] for i in range(0, len(answer), self.chunk_chars)]
+        delay = latency * 0.8 / max(1, len(chunks))
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "latency": self.latency_spec, "factors": self.factors, **self.counts}
+
+
+def create_backend(max_workers: int) -> LLMBackend:
+    """The backend named by ``AETHER_LLM_BACKEND`` (``gemini`` or ``fake``)."""
+    name = os.getenv("AETHER_LLM_BACKEND", "gemini").lower()
+    if name == "gemini":
+        return GeminiBackend(max_workers)
+    if name == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown AETHER_LLM_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
@@ -1,50 +1,353 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import os
-import re
-from typing import Any, Dict, Optional
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
-from google import genai
+from app.utils.cache import LRUCache
+from app.utils.json_extract import extract_json
+from app.utils.metrics import LLM_CALL_SECONDS, LLM_CALLS, LLM_IN_FLIGHT, LLM_TOKENS, record_cache
+from app.utils.llm_backends import LLMBackend, LLMResponse, create_backend
+from app.utils.rate_limit import RateLimiter
+from app.utils.serialization import dumps
+from app.utils.tracing import current_span, estimate_tokens, span, start_span
 
 
 class LLMClient:
-    """Gemini client using Vertex AI (OAuth / ADC)."""
+    """LLM client for the agents; Gemini on Vertex AI (OAuth / ADC) by default.
 
-    def __init__(self) -> None:
+    Calls go to an ``LLMBackend`` (``AETHER_LLM_BACKEND``: ``gemini``, or
+    ``fake`` for offline benchmarks). Completions never block the event loop:
+    the Gemini backend uses the SDK's native async API when available,
+    otherwise a bounded thread pool. ``AETHER_LLM_CONCURRENCY`` caps the
+    number of in-flight calls per worker so concurrent requests overlap their
+    LLM latency.
+
+    Responses are memoized by (model, temperature, system prompt, prompt) in a
+    bounded LRU (``AETHER_LLM_MEMO_SIZE`` entries, ``AETHER_LLM_MEMO_TTL``
+    seconds), and identical prompts already in flight share one call, so a
+    byte-identical sub-prompt never reaches Gemini twice.
+
+    Every call that does reach Gemini goes through one shared ``RateLimiter``
+    (request/token buckets, retry with backoff on 429/5xx and an adaptive
+    concurrency limit that starts at ``AETHER_LLM_CONCURRENCY``).
+
+    The backend is built on first use, or ahead of traffic by ``start()``,
+    so importing the app never pays for the Gemini SDK and its credentials.
+    """
+
+    def __init__(self, backend: Optional[LLMBackend] = None) -> None:
         self.model = os.getenv("AETHER_MODEL", "gemini-1.5-flash")
+        self.max_concurrency = max(1, int(os.getenv("AETHER_LLM_CONCURRENCY", "8")))
+        self._backend = backend
+        self.rate_limiter = RateLimiter(self.max_concurrency)
+        # Output tokens reserved per call until the real usage is known
+        self.expected_output_tokens = int(os.getenv("AETHER_LLM_EXPECTED_OUTPUT_TOKENS", "1024"))
+
+        memo_size = int(os.getenv("AETHER_LLM_MEMO_SIZE", "512"))
+        self._memo: Optional[LRUCache] = (
+            LRUCache(memo_size, float(os.getenv("AETHER_LLM_MEMO_TTL", "3600")))
+            if memo_size > 0 else None
+        )
+        # Resolves to None when the leading call was cancelled; waiters then call themselves
+        self._inflight: Dict[str, "asyncio.Future[Optional[Tuple[str, float]]]"] = {}
+        self._agent_stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def backend(self) -> LLMBackend:
+        if self._backend is None:
+            self._backend = create_backend(self.max_concurrency)
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend: LLMBackend) -> None:
+        self._backend = backend
+
+    async def start(self) -> None:
+        """Build the backend off the event loop (SDK import, credential lookup)."""
+        if self._backend is None:
+            await asyncio.to_thread(lambda: self.backend)
+
+    async def _generate(self, contents: str, config: Dict[str, Any]) -> LLMResponse:
+        return await self.backend.generate(self.model, contents, config)
+
+    def _generate_stream(self, contents: str, config: Dict[str, Any]) -> AsyncIterator[str]:
+        return self.backend.stream(self.model, contents, config)
 
-        self.client = genai.Client(
-            vertexai=True,                    # 🔑 THIS IS REQUIRED
-            project=os.getenv("GCP_PROJECT"), # optional but recommended
-            location=os.getenv("GCP_LOCATION", "us-central1"),
+    def _estimate_tokens(self, full_prompt: str) -> int:
+        # ~4 characters per token for English text
+        return len(full_prompt) // 4 + self.expected_output_tokens
+
+    @staticmethod
+    def _tokens_used(response: LLMResponse) -> Optional[int]:
+        return response.total_tokens
+
+    def _span_attributes(self, agent: str, full_prompt: str) -> Dict[str, Any]:
+        return {
+            "llm.agent": agent,
+            "llm.model": self.model,
+            "llm.prompt_chars": len(full_prompt),
+            "llm.prompt_tokens": estimate_tokens(len(full_prompt)),
+        }
+
+    @staticmethod
+    def _record_tokens(agent: str, full_prompt: str, response_chars: int) -> None:
+        LLM_TOKENS.labels(agent=agent, kind="prompt").inc(estimate_tokens(len(full_prompt)))
+        LLM_TOKENS.labels(agent=agent, kind="response").inc(estimate_tokens(response_chars))
+
+    def _memo_key(self, system: str, prompt: str, temperature: float) -> str:
+        payload = dumps([self.model, temperature, system, prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _stats_for(self, agent: str) -> Dict[str, float]:
+        return self._agent_stats.setdefault(
+            agent,
+            {
+                "calls": 0, "memo_hits": 0, "llm_calls": 0, "llm_seconds": 0.0, "saved_seconds": 0.0,
+                "json_parse_failures": 0, "json_repairs": 0, "json_repair_failures": 0,
+            },
         )
 
-    async def acompletion(self, prompt: str, system: Optional[str] = None) -> str:
+    def record_parse_failure(self, agent: str) -> None:
+        self._stats_for(agent)["json_parse_failures"] += 1
+
+    def record_repair(self, agent: str, succeeded: bool) -> None:
+        """Count one schema-guided repair call (its LLM call is already in ``calls``)."""
+        stats = self._stats_for(agent)
+        stats["json_repairs"] += 1
+        if not succeeded:
+            stats["json_repair_failures"] += 1
+
+    def memo_stats(self) -> Dict[str, Any]:
+        """Per-agent call counts, memo hits, LLM latency saved by the memo and JSON repairs."""
+        return {
+            "enabled": self._memo is not None,
+            "entries": len(self._memo) if self._memo is not None else 0,
+            "agents": {
+                agent: {**stats, "llm_seconds": round(stats["llm_seconds"], 3),
+                        "saved_seconds": round(stats["saved_seconds"], 3)}
+                for agent, stats in self._agent_stats.items()
+            },
+        }
+
+    async def acompletion(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        agent: str = "default",
+        temperature: float = 0.2,
+    ) -> str:
         system_msg = system or (
             "You are a meticulous analysis assistant. Respond with JSON only."
         )
 
         full_prompt = f"{system_msg}\n\n{prompt}"
 
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=full_prompt,
-            config={"temperature": 0.2},
+        with span(f"llm.{agent}", **self._span_attributes(agent, full_prompt)) as call_span:
+            text = await self._acompletion(system_msg, prompt, full_prompt, agent, temperature)
+            call_span.set(**{"llm.response_chars": len(text), "llm.response_tokens": estimate_tokens(len(text))})
+            self._record_tokens(agent, full_prompt, len(text))
+            return text
+
+    async def _acompletion(
+        self, system_msg: str, prompt: str, full_prompt: str, agent: str, temperature: float
+    ) -> str:
+        stats = self._stats_for(agent)
+        stats["calls"] += 1
+
+        if self._memo is None:
+            text, _ = await self._call(full_prompt, temperature, stats, agent)
+            return text
+
+        key = self._memo_key(system_msg, prompt, temperature)
+        cached = self._memo.get(key)
+        while cached is None and key in self._inflight:
+            cached = await asyncio.shield(self._inflight[key])
+        record_cache("llm_memo", cached is not None)
+        if cached is not None:
+            LLM_CALLS.labels(agent=agent, source="memo").inc()
+            stats["memo_hits"] += 1
+            stats["saved_seconds"] += cached[1]
+            current_span().set(**{"llm.memo_hit": True})
+            return cached[0]
+
+        future: "asyncio.Future[Optional[Tuple[str, float]]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._call(full_prompt, temperature, stats, agent)
+        except asyncio.CancelledError:
+            # Only this caller was cancelled; waiters make the call themselves
+            future.set_result(None)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; avoid "never retrieved" noise
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        if result[0]:
+            self._memo.set(key, result)
+        future.set_result(result)
+        return result[0]
+
+    async def astream(
+        self,
+        prompt: str,
+        system: Optional[str] = None,
+        agent: str = "default",
+        temperature: float = 0.2,
+    ) -> AsyncIterator[str]:
+        """Yield the completion text in chunks as Gemini generates it.
+
+        Shares the memo with ``acompletion``: a memoized prompt is replayed as
+        one chunk, and a finished stream is memoized for later calls.
+        """
+        system_msg = system or (
+            "You are a meticulous analysis assistant. Respond with JSON only."
         )
 
-        return response.text or ""
+        full_prompt = f"{system_msg}\n\n{prompt}"
 
-    def parse_json(self, text: str) -> Dict[str, Any]:
-        text = text.strip()
+        # Not made current: the consumer runs between chunks in its own context
+        call_span = start_span(f"llm.{agent}", **self._span_attributes(agent, full_prompt), **{"llm.stream": True})
+        chars = 0
+        try:
+            async with aclosing(self._astream(system_msg, prompt, full_prompt, agent, temperature, call_span)) as pieces:
+                async for piece in pieces:
+                    chars += len(piece)
+                    yield piece
+        except (Exception, asyncio.CancelledError) as e:
+            call_span.end(error=e)
+            raise
+        finally:
+            call_span.set(**{"llm.response_chars": chars, "llm.response_tokens": estimate_tokens(chars)})
+            call_span.end()
+            self._record_tokens(agent, full_prompt, chars)
+
+    async def _astream(
+        self, system_msg: str, prompt: str, full_prompt: str, agent: str, temperature: float, call_span: Any
+    ) -> AsyncIterator[str]:
+        stats = self._stats_for(agent)
+        stats["calls"] += 1
 
+        key: Optional[str] = None
+        if self._memo is not None:
+            key = self._memo_key(system_msg, prompt, temperature)
+            cached = self._memo.get(key)
+            while cached is None and key in self._inflight:
+                cached = await asyncio.shield(self._inflight[key])
+            record_cache("llm_memo", cached is not None)
+            if cached is not None:
+                LLM_CALLS.labels(agent=agent, source="memo").inc()
+                stats["memo_hits"] += 1
+                stats["saved_seconds"] += cached[1]
+                call_span.set(**{"llm.memo_hit": True})
+                yield cached[0]
+                return
+
+        # The backend is read by its own task so the rate-limiter slot is released
+        # as soon as the model finishes, however slowly the consumer takes the pieces
+        pieces: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        producer = asyncio.create_task(self._pump_stream(full_prompt, agent, temperature, pieces, call_span))
+        parts = []
+        try:
+            while True:
+                piece = await pieces.get()
+                if piece is None:
+                    break
+                parts.append(piece)
+                yield piece
+            elapsed = await producer
+        finally:
+            if not producer.done():
+                # Consumer stopped early or was cancelled: stop reading the backend
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+        stats["llm_calls"] += 1
+        stats["llm_seconds"] += elapsed
+        LLM_CALLS.labels(agent=agent, source="llm").inc()
+        LLM_CALL_SECONDS.labels(agent=agent).observe(elapsed)
+        call_span.set(**{"llm.seconds": round(elapsed, 4)})
+        text = "".join(parts)
+        if key is not None and text:
+            self._memo.set(key, (text, elapsed))
+
+    async def _pump_stream(
+        self,
+        full_prompt: str,
+        agent: str,
+        temperature: float,
+        pieces: "asyncio.Queue[Optional[str]]",
+        call_span: Any,
+    ) -> float:
+        """Copy the backend stream into ``pieces`` under a rate-limiter slot, then put None.
+
+        Returns the seconds the stream took. Failures before the first piece
+        are retried; after that they are raised, since text already went out.
+        """
+        attempt = 0
+        streamed = False
         try:
-            return json.loads(text)
-        except Exception:
-            pass
+            while True:
+                try:
+                    async with self.rate_limiter.slot(self._estimate_tokens(full_prompt)) as slot:
+                        started = time.perf_counter()
+                        in_flight = LLM_IN_FLIGHT.labels(agent=agent)
+                        in_flight.inc()
+                        chars = 0
+                        try:
+                            async with aclosing(self._generate_stream(full_prompt, {"temperature": temperature})) as stream:
+                                async for piece in stream:
+                                    streamed = True
+                                    chars += len(piece)
+                                    pieces.put_nowait(piece)
+                        finally:
+                            in_flight.dec()
+                            # Streamed chunks carry no usage; correct the TPM reservation by estimate
+                            slot.tokens_used = estimate_tokens(len(full_prompt)) + estimate_tokens(chars)
+                        return time.perf_counter() - started
+                except Exception as e:
+                    if streamed or not await self.rate_limiter.backoff(e, attempt):
+                        raise
+                    attempt += 1
+                    call_span.set(**{"llm.retries": attempt})
+        finally:
+            pieces.put_nowait(None)
 
-        match = re.search(r"\{[\s\S]*\}", text)
-        if match:
-            return json.loads(match.group(0))
+    async def _call(
+        self, full_prompt: str, temperature: float, stats: Dict[str, float], agent: str
+    ) -> Tuple[str, float]:
+        in_flight = LLM_IN_FLIGHT.labels(agent=agent)
 
-        raise ValueError("No valid JSON object found in LLM output")
+        async def attempt() -> Tuple[Any, float]:
+            started = time.perf_counter()
+            in_flight.inc()
+            try:
+                response = await self._generate(full_prompt, {"temperature": temperature})
+            finally:
+                in_flight.dec()
+            return response, time.perf_counter() - started
+
+        response, elapsed = await self.rate_limiter.run(
+            attempt,
+            self._estimate_tokens(full_prompt),
+            tokens_used=lambda result: self._tokens_used(result[0]),
+        )
+
+        stats["llm_calls"] += 1
+        stats["llm_seconds"] += elapsed
+        LLM_CALLS.labels(agent=agent, source="llm").inc()
+        LLM_CALL_SECONDS.labels(agent=agent).observe(elapsed)
+        usage = self._tokens_used(response)
+        if usage:
+            LLM_TOKENS.labels(agent=agent, kind="usage").inc(usage)
+        current_span().set(**{"llm.seconds": round(elapsed, 4), "llm.total_tokens": usage})
+        return response.text or "", elapsed
+
+    def parse_json(self, text: str) -> Dict[str, Any]:
+        return extract_json(text)
@@ -1,23 +1,139 @@
 from __future__ import annotations
 
 import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, Set
+
+from app.utils.serialization import dumps, dumps_bytes
+
+try:  # POSIX
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+
+ROTATION_MODES = ("size", "daily", "none")
+
+
+@contextmanager
+def _locked(lock_path: Path) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on ``lock_path``."""
+    with open(lock_path, "a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 class ReasoningLogger:
+    """Append-only JSON Lines store for reasoning sessions.
+
+    Each session is written as a single line, so the cost of logging does not
+    depend on how many sessions already exist. Writers from several workers
+    are serialised with a lock file next to the log. The active file is
+    rotated by size (``AETHER_LOG_MAX_BYTES``) or by day depending on
+    ``AETHER_LOG_ROTATION``. A legacy ``reasoning_logs.json`` array found next
+    to the log is migrated once on first write.
+    """
+
+    max_bytes = int(os.getenv("AETHER_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+    rotation = os.getenv("AETHER_LOG_ROTATION", "size").lower()
+
+    _migrated: Set[Path] = set()
+
     @staticmethod
     def save_session(session: Dict[str, Any], file_path: Path) -> None:
         file_path.parent.mkdir(parents=True, exist_ok=True)
-        if file_path.exists():
-            try:
-                data = json.loads(file_path.read_text(encoding="utf-8") or "[]")
-                if not isinstance(data, list):
-                    data = []
-            except Exception:
-                data = []
+        line = dumps_bytes(session) + b"\n"
+
+        with _locked(ReasoningLogger._lock_path(file_path)):
+            if file_path not in ReasoningLogger._migrated:
+                ReasoningLogger._migrate_legacy(file_path)
+                ReasoningLogger._migrated.add(file_path)
+            ReasoningLogger._rotate_if_needed(file_path)
+            with open(file_path, "ab") as handle:
+                handle.write(line)
+
+    @staticmethod
+    def iter_sessions(file_path: Path) -> Iterator[Dict[str, Any]]:
+        """Yield sessions from the active log file, skipping corrupt lines."""
+        if not file_path.exists():
+            return
+        with open(file_path, encoding="utf-8") as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    @staticmethod
+    def _lock_path(file_path: Path) -> Path:
+        return file_path.with_name(file_path.name + ".lock")
+
+    @staticmethod
+    def _rotate_if_needed(file_path: Path) -> None:
+        if ReasoningLogger.rotation == "none" or not file_path.exists():
+            return
+
+        stat = file_path.stat()
+        if stat.st_size == 0:
+            return
+
+        if ReasoningLogger.rotation == "daily":
+            last_write = datetime.utcfromtimestamp(stat.st_mtime).date()
+            if last_write == datetime.utcnow().date():
+                return
+            suffix = last_write.strftime("%Y%m%d")
         else:
+            if stat.st_size < ReasoningLogger.max_bytes:
+                return
+            suffix = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+
+        rotated = file_path.with_name(f"{file_path.stem}.{suffix}{file_path.suffix}")
+        counter = 1
+        while rotated.exists():
+            rotated = file_path.with_name(f"{file_path.stem}.{suffix}-{counter}{file_path.suffix}")
+            counter += 1
+        os.replace(file_path, rotated)
+
+    @staticmethod
+    def _migrate_legacy(file_path: Path) -> None:
+        """Convert a legacy JSON-array log into lines ahead of existing entries."""
+        legacy = file_path.with_suffix(".json")
+        if legacy == file_path or not legacy.exists():
+            return
+
+        try:
+            data = json.loads(legacy.read_text(encoding="utf-8") or "[]")
+        except Exception as e:
+            print(f"Warning: Skipping migration of unreadable legacy log {legacy}: {e}")
+            return
+        if not isinstance(data, list):
             data = []
 
-        data.append(session)
-        file_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path = file_path.with_name(file_path.name + ".migrating")
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            for session in data:
+                out.write(dumps(session) + "\n")
+            if file_path.exists():
+                with open(file_path, encoding="utf-8") as current:
+                    for line in current:
+                        out.write(line)
+        os.replace(tmp_path, file_path)
+        os.replace(legacy, legacy.with_name(legacy.name + ".migrated"))
@@ -0,0 +1,207 @@
+"""
+Prometheus metrics for autoscaling and dashboards, served at ``GET /metrics``.
+
+With ``AETHER_METRICS=0`` every metric below is a no-op stand-in: nothing
+is recorded, no multiprocess files are written and the route is not mounted.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import Any, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+ENABLED = os.getenv("AETHER_METRICS", "1").lower() not in ("0", "false", "no", "off")
+
+# Set for ``uvicorn --workers N``: every worker writes its samples to files
+# there and /metrics aggregates all of them, whichever worker answers
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+REQUEST_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+FAST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+
+class _NoopMetric:
+    """Stands in for every metric while metrics are disabled."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, amount: float) -> None:
+        pass
+
+
+_NOOP = _NoopMetric()
+
+
+def _metric(kind: Any, *args: Any, **kwargs: Any) -> Any:
+    return kind(*args, **kwargs) if ENABLED else _NOOP
+
+
+HTTP_REQUEST_SECONDS = _metric(
+    Histogram,
+    "aether_http_request_duration_seconds",
+    "Request latency by route template, to the last byte of the response",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS,
+)
+HTTP_IN_PROGRESS = _metric(
+    Gauge,
+    "aether_http_requests_in_progress",
+    "Requests being served",
+    multiprocess_mode="livesum",
+)
+
+LLM_CALL_SECONDS = _metric(
+    Histogram,
+    "aether_llm_call_duration_seconds",
+    "Latency of LLM calls that reached the backend (memo hits excluded)",
+    ["agent"],
+    buckets=LLM_BUCKETS,
+)
+LLM_CALLS = _metric(
+    Counter,
+    "aether_llm_calls_total",
+    "Agent LLM calls by where the answer came from (llm or memo)",
+    ["agent", "source"],
+)
+LLM_TOKENS = _metric(
+    Counter,
+    "aether_llm_tokens_total",
+    "LLM tokens: prompt/response estimated at 4 chars per token, usage as reported by the backend",
+    ["agent", "kind"],
+)
+LLM_IN_FLIGHT = _metric(
+    Gauge,
+    "aether_llm_in_flight",
+    "LLM calls waiting on the backend",
+    ["agent"],
+    multiprocess_mode="livesum",
+)
+LLM_BACKOFFS = _metric(
+    Counter,
+    "aether_llm_backoffs_total",
+    "Retries after a failed LLM call",
+    ["reason"],
+)
+LLM_BACKOFF_SECONDS = _metric(
+    Counter,
+    "aether_llm_backoff_seconds_total",
+    "Time slept before retrying LLM calls",
+)
+
+PDF_PARSE_SECONDS = _metric(
+    Histogram,
+    "aether_pdf_parse_duration_seconds",
+    "Time to parse one uploaded PDF",
+    buckets=REQUEST_BUCKETS,
+)
+PDF_PAGES = _metric(Counter, "aether_pdf_pages_parsed_total", "Pages of parsed PDFs")
+PDF_TABLE_PAGES = _metric(Counter, "aether_pdf_table_pages_total", "Pages handed to table extraction")
+PDF_TABLES = _metric(Counter, "aether_pdf_tables_found_total", "Tables found by table extraction")
+PDF_RENDER_SECONDS = _metric(
+    Histogram,
+    "aether_pdf_render_duration_seconds",
+    "Time to render one PDF report",
+    buckets=FAST_BUCKETS,
+)
+
+CACHE_LOOKUPS = _metric(
+    Counter,
+    "aether_cache_lookups_total",
+    "Lookups of the result cache and the LLM memo",
+    ["cache", "result"],
+)
+
+LOOP_LAG_SECONDS = _metric(
+    Histogram,
+    "aether_event_loop_lag_seconds",
+    "How late the event loop woke a sleeping task",
+    buckets=LAG_BUCKETS,
+)
+JOB_QUEUE_DEPTH = _metric(
+    Gauge,
+    "aether_job_queue_depth",
+    "Background jobs waiting for a worker",
+    multiprocess_mode="livesum",
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def render() -> Tuple[bytes, str]:
+    """The exposition text and its content type; aggregated over workers in multiprocess mode."""
+    if MULTIPROC_DIR is not None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the multiprocess aggregate on shutdown."""
+    if ENABLED and MULTIPROC_DIR is not None:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request by route template and status.
+
+    The route template (``/jobs/{job_id}``) is used instead of the raw path so
+    ids do not explode the label set; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def measured_send(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, measured_send)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=getattr(route, "path", None) or "unmatched",
+                status=str(status),
+            ).observe(time.perf_counter() - started)
@@ -0,0 +1,233 @@
+"""Process pool that keeps CPU-bound PDF parsing off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from app.utils.metrics import PDF_PAGES, PDF_PARSE_SECONDS, PDF_TABLE_PAGES, PDF_TABLES
+from app.utils.tracing import record_span, span
+
+
+class ParseTimeout(Exception):
+    """Raised when a parse job does not finish within the configured timeout."""
+
+
+class PageLimitExceeded(ValueError):
+    """Raised when a PDF has more pages than the configured limit."""
+
+
+def _prewarm() -> None:
+    """Worker initializer: pay the PyPDF2/Camelot/OpenCV import cost once per process."""
+    import app.utils.pdf_parser  # noqa: F401
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _parse_text(path: str, max_pages: Optional[int]) -> dict:
+    from app.utils.pdf_parser import extract_text_and_metadata
+
+    timings: dict = {}
+    pdf_data = extract_text_and_metadata(path, max_pages=max_pages, timings=timings)
+    pdf_data["timings"] = timings
+    return pdf_data
+
+
+def _parse_tables(path: str, pages: List[int]) -> Tuple[list, int, int, int]:
+    """Table metrics of ``pages``, the number of tables and the wall-clock span of the extraction."""
+    from app.utils.pdf_parser import extract_table_metrics
+
+    stats: dict = {}
+    started = time.time_ns()
+    metrics = extract_table_metrics(path, pages, stats)
+    return metrics, stats.get("tables", 0), started, time.time_ns()
+
+
+def _spool(file_bytes: bytes) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(file_bytes)
+        return tmp.name
+
+
+def _mp_context() -> Any:
+    """
+    Start workers from a forkserver (spawn where there is none), never by forking this process.
+
+    The server already runs threads when the pool starts (the default
+    executor, the trace exporter); a forked child inherits their held
+    locks and can deadlock. The forkserver imports the parser once, so each
+    worker it forks starts warm.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["app.utils.pdf_parser"])
+    return context
+
+
+class ParsePool:
+    """
+    Dedicated worker processes for PDF parsing.
+
+    A document is parsed in two phases: one job extracts text and metadata
+    and picks the pages that look like they hold ruled tables, then those
+    pages are split into chunks of ``AETHER_TABLE_PAGES_PER_JOB`` and Camelot
+    runs on the chunks in parallel. Chunk results are merged back in page
+    order.
+
+    ``AETHER_PARSE_WORKERS`` sets the worker count (``0`` parses in a thread
+    instead), ``AETHER_PARSE_TIMEOUT`` bounds how long a request waits for its
+    document (a job still running past it is stuck in Camelot; the pool is
+    replaced and its old processes are killed one timeout later, once every
+    other job on them has had its full time) and ``AETHER_MAX_PDF_PAGES`` rejects oversized documents before
+    any text or table extraction runs. Workers are started and pre-warmed by
+    ``start()`` so the first upload does not pay the import cost; without
+    workers ``start()`` imports the parser in this process instead. Nothing
+    here imports the parser at module level, so loading the pool is cheap.
+    """
+
+    def __init__(self) -> None:
+        self.workers = int(os.getenv("AETHER_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.timeout = float(os.getenv("AETHER_PARSE_TIMEOUT", "120"))
+        self.max_pages = int(os.getenv("AETHER_MAX_PDF_PAGES", "500")) or None
+        self.table_pages_per_job = max(1, int(os.getenv("AETHER_TABLE_PAGES_PER_JOB", "8")))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Processes of pools replaced after a timeout, killed once their grace period ends
+        self._retired: List[list] = []
+
+    async def start(self) -> None:
+        if self.workers <= 0:
+            await asyncio.to_thread(_prewarm)
+            return
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=_mp_context(), initializer=_prewarm
+        )
+        loop = asyncio.get_running_loop()
+        # Submitting one job per worker forces every process to spawn and import now
+        await asyncio.gather(
+            *(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers))
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for processes in list(self._retired):
+            self._kill(processes)
+
+    def _recycle(self) -> None:
+        """Route new jobs to a fresh pool; the old one's processes are killed after a grace period."""
+        old, self._executor = self._executor, None
+        if old is None:
+            return
+        print(f"Warning: PDF parse job exceeded {self.timeout:.0f}s; replacing the parse pool")
+        # ProcessPoolExecutor has no public way to reach (or kill) its workers. CPython
+        # 3.8-3.13 keep them in the private ``_processes`` dict ({pid: Process}) until
+        # shutdown; check its shape so a change there is reported, not silently ignored
+        workers = getattr(old, "_processes", None)
+        old.shutdown(wait=False)
+        if not isinstance(workers, dict) or not all(hasattr(p, "kill") for p in workers.values()):
+            print(
+                "Warning: Cannot reach the parse workers on this Python version; "
+                "the stuck job keeps its process until it ends"
+            )
+            return
+        processes = list(workers.values())
+        self._retired.append(processes)
+        asyncio.get_running_loop().call_later(self.timeout, self._kill, processes)
+
+    def _kill(self, processes: list) -> None:
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+        if processes in self._retired:
+            self._retired.remove(processes)
+
+    async def _run(self, func: Callable[..., Any], *args: Any, jobs: Optional[List[Future]] = None) -> Any:
+        if self.workers <= 0:
+            return await asyncio.to_thread(func, *args)
+        if self._executor is None:
+            await self.start()
+        future = self._executor.submit(func, *args)
+        if jobs is not None:
+            jobs.append(future)
+        return await asyncio.wrap_future(future)
+
+    async def _parse_path(self, path: str, jobs: Optional[List[Future]] = None) -> dict:
+        started = time.perf_counter()
+        with span("pdf.parse", **{"pdf.bytes": os.path.getsize(path)}) as parse_span:
+            pdf_data = await self._run(_parse_text, path, self.max_pages, jobs=jobs)
+            # Steps timed inside the worker become child spans here
+            for step, (step_start, step_end) in pdf_data.pop("timings").items():
+                record_span(f"pdf.{step}", step_start, step_end)
+
+            pages = pdf_data.pop("table_pages")
+            chunks = [
+                pages[i:i + self.table_pages_per_job]
+                for i in range(0, len(pages), self.table_pages_per_job)
+            ]
+            chunk_results = await asyncio.gather(
+                *(self._run(_parse_tables, path, chunk, jobs=jobs) for chunk in chunks)
+            )
+            pdf_data["metrics"] = []
+            tables = 0
+            for chunk, (metrics, chunk_tables, chunk_start, chunk_end) in zip(chunks, chunk_results):
+                record_span(
+                    "pdf.tables", chunk_start, chunk_end,
+                    **{"pdf.pages": len(chunk), "pdf.tables": chunk_tables, "pdf.metrics": len(metrics)},
+                )
+                pdf_data["metrics"].extend(metrics)
+                tables += chunk_tables
+            parse_span.set(**{
+                "pdf.num_pages": pdf_data["num_pages"],
+                "pdf.text_chars": len(pdf_data["text"]),
+                "pdf.table_pages": len(pages),
+                "pdf.tables": tables,
+                "pdf.metrics": len(pdf_data["metrics"]),
+            })
+        PDF_PARSE_SECONDS.observe(time.perf_counter() - started)
+        PDF_PAGES.inc(pdf_data["num_pages"])
+        PDF_TABLE_PAGES.inc(len(pages))
+        PDF_TABLES.inc(tables)
+        return pdf_data
+
+    async def parse_file(self, path: str) -> dict:
+        """
+        Parse a PDF on disk (text, metadata, table metrics) without blocking the loop.
+
+        Every job opens the same file, so the document is never copied between
+        processes. The caller keeps ownership of ``path``.
+
+        Raises:
+            ParseTimeout: If the job exceeds the configured timeout
+            PageLimitExceeded: If the PDF is longer than the page limit
+            ValueError: If PDF is invalid or corrupted
+        """
+        jobs: List[Future] = []
+        try:
+            return await asyncio.wait_for(self._parse_path(path, jobs), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # Queued jobs were cancelled with the wait; a running one holds its worker forever
+            if any(job.running() for job in jobs):
+                self._recycle()
+            raise ParseTimeout(f"PDF parsing exceeded {self.timeout:.0f}s")
+
+    async def parse(self, file_bytes: bytes) -> dict:
+        """Parse in-memory PDF bytes; see ``parse_file``."""
+        path = await asyncio.to_thread(_spool, file_bytes)
+        try:
+            return await self.parse_file(path)
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
@@ -1,162 +1,382 @@
 """PDF parsing utility to extract text and tables from PDF files."""
 
+import mmap
+import os
+import re
+import tempfile
+import time
+from functools import cached_property
 from io import BytesIO
-from typing import Optional, List
+from itertools import chain, islice
+from typing import Optional, List, Union
 import warnings
 
 from PyPDF2 import PdfReader
 import camelot
 
 from app.schemas.context import Metric
+from app.utils.parse_pool import PageLimitExceeded  # noqa: F401 - raised here, defined with the pool
 
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    """
-    Extract text from a PDF file.
+# Path construction operators in a content stream: rectangles ("re") and line segments ("l").
+_RULING_OPS = re.compile(rb"(?<![A-Za-z])(?:re|l)(?![A-Za-z])")
+# Camelot's lattice detector needs a grid; fewer path operators than this cannot form one.
+_MIN_RULING_OPS = 4
 
-    Args:
-        file_bytes: Raw PDF file bytes
 
-    Returns:
-        Extracted text from all pages, joined by newlines
+def _form_streams(resources, seen: set):
+    """Content of the Form XObjects in ``resources``, nested forms included."""
+    xobjects = resources.get("/XObject") if resources is not None else None
+    if xobjects is None:
+        return
+    xobjects = xobjects.get_object()
+    for name in xobjects:
+        ref = xobjects.raw_get(name)
+        key = getattr(ref, "idnum", None) or id(ref)
+        if key in seen:
+            continue
+        seen.add(key)
+        xobject = ref.get_object()
+        if xobject.get("/Subtype") != "/Form":
+            continue
+        yield xobject.get_data()
+        yield from _form_streams(xobject.get("/Resources"), seen)
 
-    Raises:
-        ValueError: If PDF is invalid or corrupted
+
+def _has_ruling_lines(page) -> bool:
     """
+    Cheap pre-check: does the page draw enough lines/rectangles to hold a ruled table?
+
+    Form XObjects the page paints are scanned too; exported reports often
+    draw their tables inside one.
+    """
+    found = 0
     try:
-        pdf_file = BytesIO(file_bytes)
-        reader = PdfReader(pdf_file)
+        contents = page.get_contents()
+        streams = [contents.get_data()] if contents is not None else []
+        for data in chain(streams, _form_streams(page.get("/Resources"), set())):
+            found += sum(1 for _ in islice(_RULING_OPS.finditer(data), _MIN_RULING_OPS - found))
+            if found >= _MIN_RULING_OPS:
+                return True
+    except Exception:
+        # Unreadable content stream or resources: let Camelot decide
+        return True
+    return False
+
+
+class PdfDocument:
+    """
+    A PDF parsed exactly once and shared by every extraction step.
+
+    PyPDF2 parses the document on construction. Page text, metadata and table
+    metrics are computed lazily from that single reader; table extraction
+    reuses the parsed pages to skip pages without a text layer or ruling
+    lines, and only materializes a temporary file (Camelot requires a path)
+    when the document was given as bytes and tables are actually requested.
+
+    Args:
+        source: Raw PDF file bytes, or the path of a PDF on disk
+    """
+
+    def __init__(self, source: Union[bytes, str]):
+        self._bytes: Optional[bytes] = None
+        self._file_path: Optional[str] = None
+        self._tmp_path: Optional[str] = None
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+        try:
+            if isinstance(source, (bytes, bytearray)):
+                self._bytes = bytes(source)
+                self.reader = PdfReader(BytesIO(self._bytes))
+            else:
+                # Memory-map the file so pages are read from the page cache, not copied
+                self._file_path = str(source)
+                self._file = open(self._file_path, "rb")
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.reader = PdfReader(self._mmap)
+        except Exception as e:
+            self.close()
+            raise ValueError(f"Failed to parse PDF: {str(e)}")
 
-        if not reader.pages:
-            raise ValueError("PDF has no pages")
+    def __enter__(self) -> "PdfDocument":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Release the memory map and remove any temporary file handed to Camelot."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._tmp_path is not None:
+            try:
+                os.unlink(self._tmp_path)
+            except Exception:
+                pass
+            self._tmp_path = None
+
+    @property
+    def num_pages(self) -> int:
+        return len(self.reader.pages)
+
+    @cached_property
+    def metadata(self) -> dict:
+        metadata = self.reader.metadata if self.reader.metadata else {}
+        return {
+            "title": metadata.get("/Title", ""),
+            "author": metadata.get("/Author", ""),
+            "subject": metadata.get("/Subject", ""),
+            "creator": metadata.get("/Creator", ""),
+        }
 
-        text_content = []
-        for page_num, page in enumerate(reader.pages):
+    @cached_property
+    def page_texts(self) -> List[str]:
+        """Text of every page ("" where extraction failed or found nothing)."""
+        texts = []
+        for page_num, page in enumerate(self.reader.pages):
             try:
-                text = page.extract_text()
-                if text:
-                    text_content.append(text)
+                texts.append(page.extract_text() or "")
             except Exception as e:
                 # Log but continue if one page fails
                 print(f"Warning: Failed to extract text from page {page_num + 1}: {e}")
-                continue
+                texts.append("")
+        return texts
+
+    @cached_property
+    def text(self) -> str:
+        """
+        Text from all pages, joined by newlines.
 
+        Raises:
+            ValueError: If PDF has no pages or no text could be extracted
+        """
+        if not self.reader.pages:
+            raise ValueError("Failed to parse PDF: PDF has no pages")
+
+        text_content = [text for text in self.page_texts if text]
         if not text_content:
-            raise ValueError("No text could be extracted from PDF")
+            raise ValueError("Failed to parse PDF: No text could be extracted from PDF")
 
         return "\n".join(text_content)
 
-    except Exception as e:
-        raise ValueError(f"Failed to parse PDF: {str(e)}")
+    @cached_property
+    def table_pages(self) -> List[int]:
+        """
+        1-based numbers of pages worth handing to Camelot.
 
+        A page qualifies only if it has a text layer and its content stream
+        draws enough lines/rectangles to form a ruled table.
+        """
+        return [
+            num
+            for num, (page, text) in enumerate(zip(self.reader.pages, self.page_texts), start=1)
+            if text.strip() and _has_ruling_lines(page)
+        ]
 
-def extract_tables_from_pdf(file_bytes: bytes) -> List[Metric]:
+    @property
+    def path(self) -> str:
+        """A filesystem path of the document, written to a temp file if needed."""
+        if self._file_path is not None:
+            return self._file_path
+        if self._tmp_path is None:
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+                tmp.write(self._bytes)
+                self._tmp_path = tmp.name
+        return self._tmp_path
+
+    @cached_property
+    def metrics(self) -> List[Metric]:
+        """Numeric table cells as metrics. Never raises; table parsing is optional."""
+        if not self.table_pages:
+            return []
+        return extract_table_metrics(self.path, self.table_pages)
+
+
+def extract_table_metrics(path: str, pages: List[int], stats: Optional[dict] = None) -> List[Metric]:
     """
-    Extract tables from PDF and convert to metrics.
+    Run Camelot on selected pages of a PDF and convert the tables to metrics.
+
+    Tables come back in page order, so callers that split a document into
+    page chunks can concatenate the chunk results in chunk order.
 
     Args:
-        file_bytes: Raw PDF file bytes
+        path: Path of the PDF on disk
+        pages: 1-based page numbers to scan
+        stats: If given, 'tables' is set to the number of tables found
 
     Returns:
         List of Metric objects from numeric values in tables
     """
-    metrics = []
-    
-    # Save bytes to temporary file (Camelot requires file path)
-    import tempfile
-    import os
-    
+    if not pages:
+        return []
+
     try:
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-            tmp.write(file_bytes)
-            tmp_path = tmp.name
-        
         # Suppress Camelot warnings
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            tables = camelot.read_pdf(tmp_path, pages="all")
-        
-        if not tables:
-            return metrics
-        
-        # Process each table
-        for table in tables:
-            df = table.df
-            if df.empty or len(df) < 2:  # Need at least header + 1 row
-                continue
-            
-            # First row is header
-            headers = df.iloc[0].tolist()
-            
-            # Process remaining rows
-            for row_idx in range(1, len(df)):
-                row = df.iloc[row_idx]
-                region = str(row.iloc[0]) if len(row) > 0 else None
-                
-                # Check each column for numeric values
-                for col_idx, header in enumerate(headers):
-                    if col_idx >= len(row):
-                        continue
-                    
-                    cell_value = row.iloc[col_idx]
-                    
-                    # Try to convert to numeric
-                    try:
-                        numeric_value = float(str(cell_value).strip())
-                        metric = Metric(
-                            name=str(header).strip(),
-                            region=region,
-                            value=numeric_value
-                        )
-                        metrics.append(metric)
-                    except (ValueError, TypeError):
-                        # Not numeric, skip
-                        continue
-    
+            tables = camelot.read_pdf(path, pages=",".join(str(num) for num in pages))
     except Exception as e:
         # Log but don't crash - table parsing is optional
-        print(f"Warning: Failed to extract tables from PDF: {e}")
+        print(f"Warning: Failed to extract tables from PDF pages {pages[0]}-{pages[-1]}: {e}")
+        return []
+
+    if stats is not None:
+        stats["tables"] = len(tables)
+    metrics: List[Metric] = []
+    for table in tables:
+        metrics.extend(_table_to_metrics(table.df))
+    return metrics
+
+
+def _table_to_metrics(df) -> List[Metric]:
+    """Convert one Camelot table (first row = headers) to metrics."""
+    metrics = []
+    if df.empty or len(df) < 2:  # Need at least header + 1 row
         return metrics
-    
-    finally:
-        # Clean up temporary file
-        try:
-            if 'tmp_path' in locals():
-                os.unlink(tmp_path)
-        except Exception:
-            pass
-    
+
+    # First row is header
+    headers = df.iloc[0].tolist()
+
+    # Process remaining rows
+    for row_idx in range(1, len(df)):
+        row = df.iloc[row_idx]
+        region = str(row.iloc[0]) if len(row) > 0 else None
+
+        # Check each column for numeric values
+        for col_idx, header in enumerate(headers):
+            if col_idx >= len(row):
+                continue
+
+            cell_value = row.iloc[col_idx]
+
+            # Try to convert to numeric
+            try:
+                numeric_value = float(str(cell_value).strip())
+                metric = Metric(
+                    name=str(header).strip(),
+                    region=region,
+                    value=numeric_value
+                )
+                metrics.append(metric)
+            except (ValueError, TypeError):
+                # Not numeric, skip
+                continue
+
     return metrics
 
 
-def extract_metadata_and_text(file_bytes: bytes) -> dict:
+def extract_text_from_pdf(file_bytes: bytes) -> str:
     """
-    Extract both metadata, text, and tables from PDF.
+    Extract text from a PDF file.
 
     Args:
         file_bytes: Raw PDF file bytes
 
     Returns:
-        Dictionary with 'text', 'num_pages', 'metadata', and 'metrics'
+        Extracted text from all pages, joined by newlines
+
+    Raises:
+        ValueError: If PDF is invalid or corrupted
+    """
+    return PdfDocument(file_bytes).text
+
+
+def extract_tables_from_pdf(file_bytes: bytes) -> List[Metric]:
+    """
+    Extract tables from PDF and convert to metrics.
+
+    Args:
+        file_bytes: Raw PDF file bytes
+
+    Returns:
+        List of Metric objects from numeric values in tables
     """
     try:
-        pdf_file = BytesIO(file_bytes)
-        reader = PdfReader(pdf_file)
+        document = PdfDocument(file_bytes)
+    except ValueError as e:
+        print(f"Warning: Failed to extract tables from PDF: {e}")
+        return []
+    with document:
+        return document.metrics
 
-        metadata = reader.metadata if reader.metadata else {}
-        text = extract_text_from_pdf(file_bytes)
-        metrics = extract_tables_from_pdf(file_bytes)
 
-        return {
-            "text": text,
-            "num_pages": len(reader.pages),
-            "metadata": {
-                "title": metadata.get("/Title", ""),
-                "author": metadata.get("/Author", ""),
-                "subject": metadata.get("/Subject", ""),
-                "creator": metadata.get("/Creator", ""),
-            },
-            "metrics": metrics,
-        }
+def extract_text_and_metadata(
+    source: Union[bytes, str], max_pages: Optional[int] = None, timings: Optional[dict] = None
+) -> dict:
+    """
+    Extract text and metadata, and list the pages that need table extraction.
+
+    This is the text half of extract_metadata_and_text; callers run
+    extract_table_metrics over 'table_pages' themselves (e.g. in parallel).
+
+    Args:
+        source: Raw PDF file bytes, or the path of a PDF on disk
+        max_pages: Reject documents with more pages than this (no limit if None)
+        timings: If given, filled with (start_ns, end_ns) wall-clock times of
+            the 'open', 'text', 'metadata' and 'table_pages' steps
+
+    Returns:
+        Dictionary with 'text', 'num_pages', 'metadata', and 'table_pages'
+
+    Raises:
+        PageLimitExceeded: If the PDF is longer than max_pages
+        ValueError: If PDF is invalid or corrupted
+    """
+    timings = timings if timings is not None else {}
+    try:
+        started = time.time_ns()
+        with PdfDocument(source) as document:
+            timings["open"] = (started, time.time_ns())
+            if max_pages and document.num_pages > max_pages:
+                raise PageLimitExceeded(
+                    f"PDF has {document.num_pages} pages, the limit is {max_pages}"
+                )
+            result = {"num_pages": document.num_pages}
+            for step in ("text", "metadata", "table_pages"):
+                started = time.time_ns()
+                result[step] = getattr(document, step)
+                timings[step] = (started, time.time_ns())
+            return result
+    except PageLimitExceeded:
+        raise
+    except Exception as e:
+        raise ValueError(f"Failed to extract metadata: {str(e)}")
+
+
+def extract_metadata_and_text(file_bytes: bytes, max_pages: Optional[int] = None) -> dict:
+    """
+    Extract both metadata, text, and tables from PDF.
+
+    The document is parsed once and shared by all three extraction steps.
+
+    Args:
+        file_bytes: Raw PDF file bytes
+        max_pages: Reject documents with more pages than this (no limit if None)
+
+    Returns:
+        Dictionary with 'text', 'num_pages', 'metadata', and 'metrics'
+
+    Raises:
+        PageLimitExceeded: If the PDF is longer than max_pages
+        ValueError: If PDF is invalid or corrupted
+    """
+    try:
+        with PdfDocument(file_bytes) as document:
+            if max_pages and document.num_pages > max_pages:
+                raise PageLimitExceeded(
+                    f"PDF has {document.num_pages} pages, the limit is {max_pages}"
+                )
+            return {
+                "text": document.text,
+                "num_pages": document.num_pages,
+                "metadata": document.metadata,
+                "metrics": document.metrics,
+            }
+    except PageLimitExceeded:
+        raise
     except Exception as e:
         raise ValueError(f"Failed to extract metadata: {str(e)}")
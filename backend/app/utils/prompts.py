@@ -0,0 +1,105 @@
+"""Prompt templates loaded once, validated, version-hashed and hot-reloaded on change."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import string
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+# Placeholders each str.format-rendered template must contain (others are used verbatim)
+REQUIRED_FIELDS: Dict[str, frozenset] = {
+    "factor_prompt.txt": frozenset({"context_json"}),
+    "repair_prompt.txt": frozenset({"error", "schema_json", "llm_output"}),
+}
+
+
+def _validate(name: str, text: str) -> None:
+    if not text.strip():
+        raise ValueError(f"Prompt template {name} is empty")
+    required = REQUIRED_FIELDS.get(name)
+    if required is None:
+        return
+    try:
+        fields = {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+    except ValueError as e:
+        raise ValueError(f"Prompt template {name} is not a valid format string: {e}")
+    missing = required - fields
+    unknown = fields - required
+    if missing or unknown:
+        raise ValueError(
+            f"Prompt template {name}: missing fields {sorted(missing)}, unknown fields {sorted(unknown)}"
+        )
+
+
+class PromptRegistry:
+    """
+    All templates in ``app/prompts`` kept in memory.
+
+    Templates are read and validated once when the registry is created; an
+    invalid template fails startup. With ``AETHER_PROMPT_RELOAD_INTERVAL`` > 0
+    (seconds, default 2) the directory is re-checked at most that often and
+    changed files are reloaded; a change that fails validation is reported
+    and the previous version stays in use. ``versions()`` maps each template
+    to a short content hash for use in cache keys.
+    """
+
+    def __init__(self, prompts_dir: Path) -> None:
+        self.prompts_dir = prompts_dir
+        self.reload_interval = float(os.getenv("AETHER_PROMPT_RELOAD_INTERVAL", "2"))
+        self._templates: Dict[str, str] = {}
+        self._versions: Dict[str, str] = {}
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._checked_at = 0.0
+        self.reloads = 0
+        self._scan(strict=True)
+
+    def get(self, name: str) -> str:
+        self._maybe_reload()
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt template {name!r} in {self.prompts_dir}")
+
+    def render(self, name: str, **fields: Any) -> str:
+        """Fill a format-style template (see ``REQUIRED_FIELDS``)."""
+        return self.get(name).format(**fields)
+
+    def versions(self) -> Dict[str, str]:
+        self._maybe_reload()
+        return dict(self._versions)
+
+    def _maybe_reload(self) -> None:
+        if self.reload_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        self._scan(strict=False)
+
+    def _scan(self, strict: bool) -> None:
+        for path in sorted(self.prompts_dir.glob("*.txt")):
+            stat = path.stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self._stamps.get(path.name) == stamp:
+                continue
+            data = path.read_bytes()
+            # Same newline handling as read_text(): templates are checked out with CRLF on Windows
+            text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+            try:
+                _validate(path.name, text)
+            except ValueError as e:
+                if strict:
+                    raise
+                print(f"Warning: Keeping previous version of {path.name}: {e}")
+                self._stamps[path.name] = stamp
+                continue
+            if path.name in self._templates:
+                self.reloads += 1
+                print(f"Reloaded prompt template {path.name}")
+            self._templates[path.name] = text
+            self._versions[path.name] = hashlib.sha256(data).hexdigest()[:12]
+            self._stamps[path.name] = stamp
@@ -0,0 +1,226 @@
+"""Client-side quota control for LLM calls: token buckets, backoff and AIMD concurrency."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.utils.metrics import LLM_BACKOFF_SECONDS, LLM_BACKOFFS
+
+T = TypeVar("T")
+
+# Status codes / gRPC statuses that mean "slow down" (shrink concurrency) or "try again"
+_THROTTLE_CODES = {429, 503}
+_THROTTLE_STATUSES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE"}
+_RETRY_STATUSES = _THROTTLE_STATUSES | {"INTERNAL", "DEADLINE_EXCEEDED"}
+
+
+def _error_code(error: BaseException) -> Optional[int]:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_throttle(error: BaseException) -> bool:
+    return _error_code(error) in _THROTTLE_CODES or getattr(error, "status", None) in _THROTTLE_STATUSES
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, 5xx and transient connection errors are worth retrying; other errors are not."""
+    code = _error_code(error)
+    if code is not None and (code == 429 or 500 <= code < 600):
+        return True
+    if getattr(error, "status", None) in _RETRY_STATUSES:
+        return True
+    return isinstance(error, (ConnectionError, asyncio.TimeoutError))
+
+
+class TokenBucket:
+    """
+    Refills at ``per_minute / 60`` units per second up to one minute's worth.
+
+    Waiters are served in FIFO order. ``adjust`` corrects a reservation once
+    the real cost is known and may leave the bucket in debt, which delays the
+    next caller instead of overshooting the quota.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take ``amount`` units, waiting as needed; returns the seconds waited."""
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+        return time.monotonic() - started
+
+    def adjust(self, delta: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit: +1 slot per limit's worth of successes, halved on throttling.
+
+    Only calls admitted after the last decrease can trigger another one, so a
+    burst of throttled responses from one window halves the limit once. The
+    limit never exceeds ``max_limit`` (``AETHER_LLM_CONCURRENCY``) nor drops
+    below ``min_limit``.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1) -> None:
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns the admission time to pass back to ``release``."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, admitted_at: float, succeeded: bool, throttled: bool) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                if admitted_at > self._last_decrease:
+                    self.limit = max(float(self.min_limit), self.limit / 2)
+                    self._last_decrease = time.monotonic()
+                    self.decreases += 1
+            elif succeeded and self.limit < self.max_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class CallSlot:
+    """Handed to the caller inside ``RateLimiter.slot``; set ``tokens_used`` once known."""
+
+    def __init__(self, estimated_tokens: int) -> None:
+        self.estimated_tokens = estimated_tokens
+        self.tokens_used: Optional[int] = None
+
+
+class RateLimiter:
+    """
+    Shared gate in front of every Gemini call made by one ``LLMClient``.
+
+    Each call first takes one unit from the requests-per-minute bucket
+    (``AETHER_LLM_RPM``) and its estimated tokens from the tokens-per-minute
+    bucket (``AETHER_LLM_TPM``); either is disabled when set to 0. It then
+    waits for a slot under the adaptive concurrency limit. Calls that fail
+    with 429/5xx are retried up to ``AETHER_LLM_MAX_RETRIES`` times with
+    full-jitter exponential backoff (``AETHER_LLM_BACKOFF_BASE`` doubling up
+    to ``AETHER_LLM_BACKOFF_MAX`` seconds), and throttling responses halve the
+    concurrency limit, which then grows back on success.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        rpm = float(os.getenv("AETHER_LLM_RPM", "0"))
+        tpm = float(os.getenv("AETHER_LLM_TPM", "0"))
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.concurrency = AdaptiveConcurrency(
+            max_concurrency, int(os.getenv("AETHER_LLM_MIN_CONCURRENCY", "1"))
+        )
+        self.max_retries = max(0, int(os.getenv("AETHER_LLM_MAX_RETRIES", "5")))
+        self.backoff_base = float(os.getenv("AETHER_LLM_BACKOFF_BASE", "1.0"))
+        self.backoff_max = float(os.getenv("AETHER_LLM_BACKOFF_MAX", "30"))
+        self._stats: Dict[str, float] = {
+            "calls": 0, "retries": 0, "throttled": 0, "failures": 0,
+            "backoff_seconds": 0.0, "quota_wait_seconds": 0.0,
+        }
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int) -> AsyncIterator[CallSlot]:
+        """Hold quota and a concurrency slot for one attempt."""
+        call = CallSlot(estimated_tokens)
+        waited = 0.0
+        if self.requests is not None:
+            waited += await self.requests.acquire(1)
+        if self.tokens is not None:
+            waited += await self.tokens.acquire(estimated_tokens)
+        self._stats["quota_wait_seconds"] += waited
+        admitted_at = await self.concurrency.acquire()
+        self._stats["calls"] += 1
+
+        succeeded = throttled = False
+        try:
+            yield call
+            succeeded = True
+        except BaseException as e:
+            throttled = is_throttle(e)
+            if throttled:
+                self._stats["throttled"] += 1
+            raise
+        finally:
+            await self.concurrency.release(admitted_at, succeeded, throttled)
+            if self.tokens is not None and call.tokens_used is not None:
+                self.tokens.adjust(call.tokens_used - estimated_tokens)
+
+    async def backoff(self, error: BaseException, attempt: int) -> bool:
+        """Sleep before retry number ``attempt + 1``; False if ``error`` should be raised instead."""
+        if not is_retryable(error) or attempt >= self.max_retries:
+            self._stats["failures"] += 1
+            return False
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        self._stats["retries"] += 1
+        self._stats["backoff_seconds"] += delay
+        LLM_BACKOFFS.labels(reason="throttled" if is_throttle(error) else "error").inc()
+        LLM_BACKOFF_SECONDS.inc(delay)
+        print(f"Warning: LLM call failed ({error}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        return True
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        estimated_tokens: int,
+        tokens_used: Optional[Callable[[T], Optional[int]]] = None,
+    ) -> T:
+        """Run ``call`` under the limits, retrying throttled and transient failures."""
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(estimated_tokens) as slot:
+                    result = await call()
+                    if tokens_used is not None:
+                        slot.tokens_used = tokens_used(result)
+                    return result
+            except Exception as e:
+                if not await self.backoff(e, attempt):
+                    raise
+                attempt += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **{key: round(value, 3) if isinstance(value, float) else value for key, value in self._stats.items()},
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "max_concurrency": self.concurrency.max_limit,
+            "in_flight": self.concurrency.in_flight,
+            "concurrency_decreases": self.concurrency.decreases,
+            "rpm_limit": self.requests.capacity if self.requests is not None else None,
+            "tpm_limit": self.tokens.capacity if self.tokens is not None else None,
+        }
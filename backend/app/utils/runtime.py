@@ -0,0 +1,99 @@
+"""Process health signals for load tests and monitoring: event-loop lag and resident memory."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import resource
+import sys
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to the peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # KiB on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes a task that sleeps ``interval`` seconds.
+
+    Anything that blocks the loop (CPU-bound parsing or rendering, a sync
+    call) shows up as lag for every request in the worker. Samples from the
+    last ``history_seconds`` are kept so ``stats(window)`` can report the
+    worst lag over a recent window. ``AETHER_LOOP_LAG_INTERVAL`` (default
+    0.1 s, ``0`` disables) sets the sampling period. ``observer``, if given,
+    receives every sample in seconds (e.g. a metrics histogram).
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        history_seconds: float = 60.0,
+        observer: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        self.interval = interval if interval is not None else float(os.getenv("AETHER_LOOP_LAG_INTERVAL", "0.1"))
+        self.history_seconds = history_seconds
+        self.observer = observer
+        self._samples: Deque[Tuple[float, float]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.record(max(0.0, now - started - self.interval), now)
+
+    def record(self, lag: float, now: float) -> None:
+        self.last = lag
+        self.count += 1
+        self.total += lag
+        self.max = max(self.max, lag)
+        self._samples.append((now, lag))
+        if self.observer is not None:
+            self.observer(lag)
+        while self._samples and self._samples[0][0] < now - self.history_seconds:
+            self._samples.popleft()
+
+    def stats(self, window: Optional[float] = None) -> Dict[str, Any]:
+        """Lag in milliseconds: last sample, mean and max since start, and max over the last ``window`` seconds."""
+        result: Dict[str, Any] = {
+            "enabled": self._task is not None,
+            "interval_ms": round(self.interval * 1000, 1),
+            "samples": self.count,
+            "last_ms": round(self.last * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+        }
+        if window is not None:
+            since = time.perf_counter() - window
+            recent = [lag for at, lag in self._samples if at >= since]
+            result["window_seconds"] = window
+            result["window_max_ms"] = round(max(recent) * 1000, 2) if recent else 0.0
+        return result
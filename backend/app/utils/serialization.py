@@ -0,0 +1,95 @@
+"""Serialize each model once per request and encode JSON with orjson."""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import orjson
+from pydantic import BaseModel
+
+
+class SerializationMemo:
+    """
+    JSON of the models serialized during one request, keyed by object identity.
+
+    The model is kept alongside its dump so the id cannot be reused while
+    the entry exists. Locked because prompts are also built in worker
+    threads (``asyncio.to_thread`` copies the request's context).
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[int, Tuple[BaseModel, str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: BaseModel, dump: Callable[[], str]) -> str:
+        key = id(model)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] is model:
+            return entry[1]
+        value = dump()
+        with self._lock:
+            self._entries[key] = (model, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_memo: ContextVar[Optional[SerializationMemo]] = ContextVar("aether_serialization_memo", default=None)
+
+
+@contextmanager
+def serialization_scope() -> Iterator[SerializationMemo]:
+    """
+    Memoize ``model_json`` until the block ends; one scope per request.
+
+    Tasks and threads started inside the block share the memo. A nested
+    scope reuses the enclosing one. Outside any scope nothing is memoized.
+    """
+    memo = _memo.get()
+    if memo is not None:
+        yield memo
+        return
+    memo = SerializationMemo()
+    token = _memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _memo.reset(token)
+        memo.clear()
+
+
+def model_json(model: BaseModel) -> str:
+    """
+    ``model.model_dump_json()``, computed once per model object and request.
+
+    Every agent prompt of a request embeds the same context and factor
+    objects, so inside a ``serialization_scope`` each is serialized once and
+    reused. Models are treated as immutable once they enter the pipeline.
+    """
+    memo = _memo.get()
+    return memo.get(model, model.model_dump_json) if memo is not None else model.model_dump_json()
+
+
+def model_dict(model: BaseModel) -> Dict[str, Any]:
+    """
+    ``model.model_dump(mode="json")``, freshly built on every call.
+
+    Not memoized: the dicts end up in events, the session log, job records
+    and API responses, each of which owns (and may change) its copy.
+    """
+    return model.model_dump(mode="json")
+
+
+def dumps(data: Any) -> str:
+    """Compact JSON text (UTF-8, not ASCII-escaped); unknown types fall back to ``str``."""
+    return orjson.dumps(data, default=str).decode("utf-8")
+
+
+def dumps_bytes(data: Any) -> bytes:
+    return orjson.dumps(data, default=str)
@@ -0,0 +1,56 @@
+"""Server-Sent Events streaming of orchestrator progress."""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from app.orchestrator import AetherOrchestrator
+from app.schemas.context import ReasoningContext
+from app.utils.serialization import dumps
+
+
+def format_event(event: str, data: Any) -> str:
+    """Encode one SSE frame."""
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+async def stream_analysis(
+    orchestrator: AetherOrchestrator, context: ReasoningContext, use_cache: bool = True
+) -> AsyncIterator[str]:
+    """
+    Run ``orchestrator.analyze`` and yield its events as SSE frames.
+
+    Frames are flushed as soon as each event fires, ending with ``result``
+    (or ``error``). If the client disconnects the generator is closed and the
+    running analysis is cancelled.
+    """
+    queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue()
+
+    async def on_event(event: str, payload: Dict[str, Any]) -> None:
+        queue.put_nowait((event, payload))
+
+    async def run() -> None:
+        try:
+            await orchestrator.analyze(context, use_cache=use_cache, on_event=on_event)
+        except Exception as e:
+            queue.put_nowait(("error", {
+                "status_code": getattr(e, "status_code", 500),
+                "detail": getattr(e, "detail", None) or str(e),
+            }))
+        finally:
+            queue.put_nowait(None)
+
+    task = asyncio.create_task(run())
+    try:
+        # Opening comment so proxies and clients see bytes immediately
+        yield ": stream opened\n\n"
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield format_event(*item)
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,351 @@
+"""Per-request tracing: nested spans exported as OpenTelemetry (OTLP/JSON) traces."""
+
+from __future__ import annotations
+
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.logger import ReasoningLogger
+from app.utils.serialization import dumps_bytes
+
+ENABLED = os.getenv("AETHER_TRACING", "1").lower() not in ("0", "false", "no", "off")
+
+# Health, stats and docs routes: polled constantly and not worth a trace each
+EXCLUDE_PATHS = frozenset(
+    path.strip()
+    for path in os.getenv(
+        "AETHER_TRACE_EXCLUDE_PATHS",
+        "/,/metrics,/runtime/stats,/cache/stats,/llm/stats,/pipeline/stats,/docs,/redoc,/openapi.json",
+    ).split(",")
+    if path.strip()
+)
+
+_current: ContextVar[Optional["Span"]] = ContextVar("aether_span", default=None)
+
+
+def estimate_tokens(chars: int) -> int:
+    # ~4 characters per token for English text
+    return chars // 4
+
+
+class Trace:
+    """All spans of one request; exported when its root span ends."""
+
+    def __init__(self, request_id: Optional[str] = None) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.request_id = request_id or self.trace_id[:16]
+        self.root: Optional[Span] = None
+        self.spans: List[Span] = []
+
+    def summary(self) -> Dict[str, Any]:
+        """Count, total and max duration per span name over the spans finished so far."""
+        stages: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            stage = stages.setdefault(span.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] += span.duration_ms
+            stage["max_ms"] = max(stage["max_ms"], span.duration_ms)
+        for stage in stages.values():
+            stage["total_ms"] = round(stage["total_ms"], 2)
+            stage["max_ms"] = round(stage["max_ms"], 2)
+        return {
+            "trace_id": self.trace_id,
+            "request_id": self.request_id,
+            "spans": len(self.spans),
+            "stages": stages,
+        }
+
+    def to_otlp(self, service_name: str) -> Dict[str, Any]:
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _attributes({"service.name": service_name, "process.pid": os.getpid()})},
+                "scopeSpans": [{
+                    "scope": {"name": "aether"},
+                    "spans": [span.to_otlp() for span in self.spans],
+                }],
+            }],
+        }
+
+
+class Span:
+    """One timed operation; ``set()`` adds attributes while it runs."""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(
+        self,
+        name: str,
+        trace: Trace,
+        parent_id: Optional[str],
+        attributes: Dict[str, Any],
+        start_ns: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def end(self, error: Optional[BaseException] = None, end_ns: Optional[int] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"[:500]
+        self.trace.spans.append(self)
+        if self.trace.root is self:
+            exporter.submit(self.trace)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span: Dict[str, Any] = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2 if self.parent_id is None else 1,  # SERVER for the root, INTERNAL below it
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _attributes(self.attributes),
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 0},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Stands in for a span while tracing is disabled."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException] = None, end_ns: Optional[int] = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _attributes(values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    result = []
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            encoded = {"boolValue": value}
+        elif isinstance(value, int):
+            encoded = {"intValue": str(value)}
+        elif isinstance(value, float):
+            encoded = {"doubleValue": value}
+        else:
+            encoded = {"stringValue": str(value)}
+        result.append({"key": key, "value": encoded})
+    return result
+
+
+def current_span() -> Any:
+    """The active span, or a no-op stand-in outside any trace."""
+    current = _current.get()
+    return current if current is not None else NOOP_SPAN
+
+
+def current_trace() -> Optional[Trace]:
+    current = _current.get()
+    return current.trace if current is not None else None
+
+
+def start_span(name: str, request_id: Optional[str] = None, start_ns: Optional[int] = None, **attributes: Any):
+    """
+    Start a span under the current one without making it current.
+
+    For work whose begin and end are not one ``with`` block (async
+    generators, timings reported by worker processes); the caller must call
+    ``end()``. With no current span the span is the root of a new trace.
+    """
+    if not ENABLED:
+        return NOOP_SPAN
+    parent = _current.get()
+    if parent is None:
+        trace = Trace(request_id)
+        span = Span(name, trace, None, attributes, start_ns)
+        trace.root = span
+        span.attributes["aether.request_id"] = trace.request_id
+        return span
+    return Span(name, parent.trace, parent.span_id, attributes, start_ns)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+    """Add a finished span under the current one (e.g. timed in a worker process); no-op outside a trace."""
+    if _current.get() is None:
+        return
+    start_span(name, start_ns=start_ns, **attributes).end(end_ns=end_ns)
+
+
+@contextmanager
+def span(name: str, request_id: Optional[str] = None, **attributes: Any) -> Iterator[Any]:
+    """Time the block as a child of the current span (or as a new trace's root)."""
+    if not ENABLED:
+        yield NOOP_SPAN
+        return
+    current = start_span(name, request_id, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    else:
+        current.end()
+    finally:
+        _current.reset(token)
+
+
+class TraceExporter:
+    """
+    Writes finished traces from a background thread so requests never wait on export.
+
+    Each trace is one OTLP/JSON line appended to ``AETHER_TRACE_FILE``
+    (default ``logs/traces.jsonl``, empty disables; rotated like the
+    reasoning log) and, when ``AETHER_TRACE_OTLP_ENDPOINT`` is set, posted to
+    an OpenTelemetry collector (e.g. ``http://localhost:4318/v1/traces``).
+    At most ``AETHER_TRACE_QUEUE_SIZE`` traces wait; beyond that they are
+    dropped and counted.
+    """
+
+    def __init__(self) -> None:
+        default_file = Path(__file__).resolve().parents[2] / "logs" / "traces.jsonl"
+        file_setting = os.getenv("AETHER_TRACE_FILE", str(default_file)).strip()
+        self.file_path: Optional[Path] = Path(file_setting) if file_setting else None
+        self.endpoint = os.getenv("AETHER_TRACE_OTLP_ENDPOINT", "").strip()
+        self.service_name = os.getenv("AETHER_TRACE_SERVICE_NAME", "aether")
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(int(os.getenv("AETHER_TRACE_QUEUE_SIZE", "1000")))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return ENABLED and (self.file_path is not None or bool(self.endpoint))
+
+    def submit(self, trace: Trace) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="aether-trace-export", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Export what is queued and stop the thread (it restarts on the next trace)."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            try:
+                self._export(trace)
+                self.exported += 1
+            except Exception as e:
+                self.failures += 1
+                print(f"Warning: Failed to export trace {trace.trace_id}: {e}")
+
+    def _export(self, trace: Trace) -> None:
+        payload = trace.to_otlp(self.service_name)
+        if self.file_path is not None:
+            ReasoningLogger.save_session(payload, self.file_path)
+        if self.endpoint:
+            request = urllib.request.Request(
+                self.endpoint,
+                data=dumps_bytes(payload),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                response.read()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "file": str(self.file_path) if self.file_path is not None else None,
+            "endpoint": self.endpoint or None,
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failures": self.failures,
+        }
+
+
+exporter = TraceExporter()
+
+
+class TracingMiddleware:
+    """
+    Open a root span per HTTP request and echo its id as ``X-Request-ID``.
+
+    A client-supplied ``X-Request-ID`` is kept so traces can be joined with
+    the caller's logs. The span stays open until the app returns, so a
+    streamed response is traced to its last byte. Paths in
+    ``exclude_paths`` (default ``AETHER_TRACE_EXCLUDE_PATHS``) are not traced.
+    """
+
+    def __init__(self, app: ASGIApp, exclude_paths: Optional[Iterable[str]] = None) -> None:
+        self.app = app
+        self.exclude_paths = EXCLUDE_PATHS if exclude_paths is None else frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not ENABLED or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:128] or None
+        method = scope["method"]
+
+        with span(f"{method} {scope['path']}", request_id, **{"http.method": method, "http.target": scope["path"]}) as root:
+            async def traced_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    root.set(**{"http.status_code": message["status"]})
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-request-id", root.trace.request_id.encode("latin-1"))
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, traced_send)
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                root.name = f"{method} {route.path}"
@@ -0,0 +1,281 @@
+"""Bounded-memory ingest of uploaded files."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Upload bytes buffered on the event loop before one write in a worker thread
+UPLOAD_WRITE_BATCH = 1024 * 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=413, detail=f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit"
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized request bodies while they are still streaming in.
+
+    A declared ``Content-Length`` above the limit is refused before any body
+    is read; otherwise the bytes are counted as they arrive and the request
+    fails with 413 as soon as the running total crosses the limit, so an
+    oversized upload is never read to the end.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: Iterable[str]) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0 or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            await _send_413(send, self.max_bytes)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _send_413(send: Send, max_bytes: int) -> None:
+    body = ('{"detail":"Upload exceeds the %d MB limit"}' % (max_bytes // (1024 * 1024))).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class _SpooledPart:
+    """One uploaded file: bytes parsed but not yet written, and its spool file once opened."""
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.path: Optional[str] = None
+        self.file: Optional[Any] = None
+        self.pending: List[bytes] = []
+        self.size = 0
+        self.done = False
+        self.error: Optional[HTTPException] = None
+
+
+class _UploadSpool:
+    """
+    Multipart parser callbacks that collect the file parts of one form field.
+
+    The callbacks run on the event loop and only buffer bytes; ``flush()``
+    does the disk work (create, write, close, unlink) and is run in a
+    thread once ``UPLOAD_WRITE_BATCH`` bytes are buffered or a part ends.
+    """
+
+    def __init__(self, field: str, max_bytes: int, max_files: int) -> None:
+        self.field = field
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.parts: List[Union[_SpooledPart, Tuple[str, HTTPException]]] = []
+        self.pending_bytes = 0
+        self._dirty = False
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._current: Optional[_SpooledPart] = None
+        # Parts with disk work left; flush() and discard() never overlap
+        self._open: List[_SpooledPart] = []
+        self._lock = threading.Lock()
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    @property
+    def needs_flush(self) -> bool:
+        return self._dirty or self.pending_bytes >= UPLOAD_WRITE_BATCH
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name", b"").decode("latin-1") != self.field or b"filename" not in options:
+            # Not one of our files: its data is skipped
+            return
+        if self.max_files > 0 and len(self.parts) >= self.max_files:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds the {self.max_files} file limit")
+        filename = options[b"filename"].decode("utf-8", "replace")
+        if not filename.lower().endswith(".pdf"):
+            self.parts.append((filename, HTTPException(status_code=400, detail="Only PDF files are supported")))
+            return
+        self._current = _SpooledPart(filename)
+        self.parts.append(self._current)
+        self._open.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self._current
+        if part is None or part.error is not None:
+            return
+        part.size += end - start
+        if self.max_bytes > 0 and part.size > self.max_bytes:
+            # This file fails on its own; the rest of the request is still read
+            self.pending_bytes -= sum(len(piece) for piece in part.pending)
+            part.pending = []
+            part.error = _too_large(self.max_bytes)
+            self._dirty = True
+            return
+        part.pending.append(data[start:end])
+        self.pending_bytes += end - start
+
+    def on_part_end(self) -> None:
+        if self._current is not None:
+            self._current.done = True
+            self._current = None
+            self._dirty = True
+
+    def flush(self) -> None:
+        """Write the buffered bytes to the spool files; blocking, run it in a thread."""
+        with self._lock:
+            for part in self._open:
+                if part.error is None and (part.pending or part.done) and part.file is None:
+                    fd, part.path = tempfile.mkstemp(suffix=".pdf", prefix="aether-upload-")
+                    part.file = os.fdopen(fd, "wb")
+                if part.error is None and part.pending:
+                    part.file.write(b"".join(part.pending))
+                    part.pending = []
+                if part.error is not None or part.done:
+                    self._close(part, unlink=part.error is not None)
+            self._open = [part for part in self._open if not (part.done or part.error is not None)]
+            self.pending_bytes = 0
+            self._dirty = False
+
+    def discard(self) -> None:
+        with self._lock:
+            for part in self.parts:
+                if isinstance(part, _SpooledPart):
+                    self._close(part, unlink=True)
+            self._open = []
+
+    @staticmethod
+    def _close(part: _SpooledPart, unlink: bool) -> None:
+        if part.file is not None:
+            part.file.close()
+            part.file = None
+        if unlink and part.path is not None:
+            try:
+                os.unlink(part.path)
+            except FileNotFoundError:
+                pass
+            part.path = None
+
+    def items(self) -> List[Tuple[str, Union[str, HTTPException]]]:
+        return [
+            (part.filename, part.error or part.path) if isinstance(part, _SpooledPart) else part
+            for part in self.parts
+        ]
+
+
+async def receive_uploads(
+    request: Request, field: str, max_bytes: int = 0, max_files: int = 0
+) -> List[Tuple[str, Union[str, HTTPException]]]:
+    """
+    Stream the files of multipart form field ``field`` straight into spool files.
+
+    The body is parsed as it arrives, so each upload is written to disk
+    once; Starlette's form parsing would spool it to its own temp file
+    first. Writes are batched and done in a worker thread, so the event
+    loop never blocks on the disk. Returns ``(filename, path)`` per file in
+    request order, with an HTTPException in place of the path for a file
+    that is not a PDF (400) or larger than max_bytes (413). The caller owns
+    the paths and must delete them.
+
+    Raises:
+        HTTPException: 400 for a body that is not multipart, 413 for more
+            than max_files files (when > 0)
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    spool = _UploadSpool(field, max_bytes, max_files)
+    parser = MultipartParser(params[b"boundary"], spool.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if spool.needs_flush:
+                await asyncio.to_thread(spool.flush)
+        parser.finalize()
+        await asyncio.to_thread(spool.flush)
+    except HTTPException:
+        spool.discard()
+        raise
+    except Exception as e:
+        spool.discard()
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    except BaseException:
+        spool.discard()
+        raise
+    return spool.items()
+
+
+def upload_schema(field: str, multiple: bool = False) -> Dict[str, Any]:
+    """``openapi_extra`` documenting the multipart body an endpoint reads with receive_uploads."""
+    item = {"type": "string", "format": "binary"}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {field: {"type": "array", "items": item} if multiple else item},
+                        "required": [field],
+                    }
+                }
+            },
+        }
+    }
@@ -1,4 +1,16 @@
-"""Generate a messy, unorganized test PDF with tables (realistic real-world document)."""
+"""Generate a messy, unorganized test PDF with tables (realistic real-world document).
+
+Usage:
+    python generate_messy_report_with_tables.py
+    python generate_messy_report_with_tables.py --pages 500 --output bench_500.pdf
+
+Without ``--pages`` the original 3-page report is written. With ``--pages N``
+(1-500) the document has exactly N pages, each a messy section with a ruled
+table whose figures vary per page, for benchmarking PDF parsing at scale.
+"""
+
+import argparse
+import random
 
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
@@ -6,6 +18,87 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib.units import inch
 
+MAX_PAGES = 500
+
+_REGIONS = ['North America', 'Europe (EMEA)', 'APAC', 'LATAM', 'Middle East']
+_TOPICS = [
+    ('Regional Revenue', colors.grey, colors.beige),
+    ('Sales Team Performance', colors.HexColor('#3b82f6'), colors.beige),
+    ('Customer Health', colors.HexColor('#10b981'), colors.lightgoldenrodyellow),
+    ('Competitive Landscape', colors.HexColor('#ef4444'), colors.lavenderblush),
+]
+_NOTES = [
+    "Spanish office data missing - still waiting on the regional report.",
+    "CRM migration issues: ~15% of opportunities lack clear close dates.",
+    "Figures unverified by finance. Some data pulled manually (error risk).",
+    "Churn root cause analysis pending - customer success to follow up.",
+    "Commission change raised payroll ~9%; sales velocity up 14%. Sustainable?",
+]
+
+
+def _section_page(story, styles, page, rng):
+    """One page of messy narrative plus a ruled table whose figures vary with ``page``."""
+    topic, header_color, body_color = _TOPICS[page % len(_TOPICS)]
+    quarter = f"Q{page % 4 + 1} {2020 + page // 4 % 6}"
+    story.append(Paragraph(f"<b>{topic} - {quarter} (section {page + 1}, DRAFT)</b>", styles['Heading3']))
+    growth = rng.uniform(-12, 18)
+    churn = rng.uniform(8, 14)
+    story.append(Paragraph(
+        f"{topic} for {quarter}: revenue growth was {growth:.1f}% YoY while churn moved to "
+        f"{churn:.1f}%. {rng.choice(_REGIONS)} remains the main concern. {rng.choice(_NOTES)} "
+        f"Pipeline coverage is {rng.uniform(1.5, 3.5):.1f}x with {rng.randint(20, 120)} open deals.",
+        styles['Normal']
+    ))
+    story.append(Spacer(1, 0.2*inch))
+
+    rows = [['Region', 'Current', 'Previous', 'YoY Growth', 'Target', 'Status']]
+    for region in _REGIONS[:4]:
+        current = rng.uniform(0.5, 3.0)
+        previous = current / (1 + rng.uniform(-0.15, 0.2))
+        target = current * rng.uniform(0.9, 1.2)
+        change = (current / previous - 1) * 100
+        rows.append([
+            region, f'${current:.2f}M', f'${previous:.2f}M', f'{change:+.0f}%', f'${target:.2f}M',
+            'On Track' if current >= target else 'Below Target',
+        ])
+    table = Table(rows, colWidths=[1.5*inch, 1*inch, 1*inch, 1*inch, 1*inch, 1.2*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), header_color),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), body_color),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]))
+    story.append(table)
+    story.append(Spacer(1, 0.2*inch))
+    story.append(Paragraph(f"<b>NOTE:</b> {rng.choice(_NOTES)}", styles['Normal']))
+
+
+def create_paged_pdf_with_tables(filename, pages, seed=0):
+    """Create a messy report of exactly ``pages`` pages (1-500), one table per page."""
+    if not 1 <= pages <= MAX_PAGES:
+        raise ValueError(f"pages must be between 1 and {MAX_PAGES}")
+
+    rng = random.Random(seed)
+    doc = SimpleDocTemplate(filename, pagesize=letter)
+    story = []
+    styles = getSampleStyleSheet()
+
+    story.append(Paragraph("<b>MULTI-QUARTER PERFORMANCE ANALYSIS</b>", styles['Title']))
+    story.append(Paragraph("Internal Document | Confidential | Compiled from regional drafts", styles['Normal']))
+    story.append(Spacer(1, 0.2*inch))
+    for page in range(pages):
+        if page:
+            story.append(PageBreak())
+        _section_page(story, styles, page, rng)
+
+    doc.build(story)
+    print(f"✅ Messy PDF with tables created: {filename} ({pages} pages)")
+
+
 def create_messy_pdf_with_tables(filename="messy_report_with_tables.pdf"):
     """Create a realistic, messy business report PDF with tables."""
     
@@ -217,4 +310,13 @@ def create_messy_pdf_with_tables(filename="messy_report_with_tables.pdf"):
     print(f"✅ Messy realistic PDF with tables created: {filename}")
 
 if __name__ == "__main__":
-    create_messy_pdf_with_tables()
+    parser = argparse.ArgumentParser(description="Generate a messy test PDF with tables.")
+    parser.add_argument("--pages", type=int, help=f"Exact page count (1-{MAX_PAGES}); default is the original report")
+    parser.add_argument("--output", "-o", help="Output file")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated figures")
+    args = parser.parse_args()
+
+    if args.pages is None:
+        create_messy_pdf_with_tables(args.output or "messy_report_with_tables.pdf")
+    else:
+        create_paged_pdf_with_tables(args.output or f"messy_report_{args.pages}p.pdf", args.pages, args.seed)
@@ -0,0 +1,115 @@
+"""Analyze a folder of PDFs and/or ReasoningContext JSON files in one batch.
+
+Usage:
+    python run_batch.py reports/ extra.pdf contexts.json --output results.json
+
+Directories are scanned (non-recursively) for ``*.pdf`` and ``*.json`` files.
+A JSON file holds one ReasoningContext object or a list of them. Items run in
+this process under the same budget as the ``/batch`` API
+(``AETHER_BATCH_CONCURRENCY``, ``AETHER_LLM_CONCURRENCY``,
+``AETHER_PARSE_WORKERS``).
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+
+def collect_items(paths: List[str]) -> list:
+    from app.schemas.context import ReasoningContext
+
+    files: List[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in (".pdf", ".json")))
+        else:
+            files.append(path)
+
+    items = []
+    for path in files:
+        if path.suffix.lower() == ".pdf":
+            items.append((str(path), str(path) if path.exists() else FileNotFoundError(f"No such file: {path}")))
+            continue
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            items.append((str(path), e))
+            continue
+        entries = data if isinstance(data, list) else [data]
+        for index, entry in enumerate(entries):
+            name = f"{path}[{index}]" if isinstance(data, list) else str(path)
+            try:
+                items.append((name, ReasoningContext(**entry)))
+            except Exception as e:
+                items.append((name, e))
+    return items
+
+
+async def run(args: argparse.Namespace) -> int:
+    from app.batch import BatchRunner
+    from app.orchestrator import AetherOrchestrator
+    from app.utils.parse_pool import ParsePool
+
+    items = collect_items(args.paths)
+    if not items:
+        print("No PDF or JSON inputs found.")
+        return 1
+
+    parse_pool = ParsePool()
+    await parse_pool.start()
+    try:
+        runner = BatchRunner(AetherOrchestrator(), parse_pool)
+        report = await runner.run(items, use_cache=not args.no_cache)
+    finally:
+        parse_pool.shutdown()
+
+    for item in report["items"]:
+        if item["status"] == "succeeded":
+            print(f"  OK    {item['name']} ({item['seconds']}s)")
+        else:
+            print(f"  FAIL  {item['name']}: {item['error']['status_code']} {item['error']['detail']}")
+
+    stats = report["stats"]
+    print(
+        f"\n{stats['succeeded']}/{stats['items']} succeeded in {stats['elapsed_seconds']}s | "
+        f"{stats['docs_per_minute']} docs/min | {stats['llm_calls_per_minute']} LLM calls/min"
+    )
+
+    if args.output:
+        Path(args.output).write_text(
+            json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding="utf-8"
+        )
+        print(f"Results written to {args.output}")
+    return 0 if stats["failed"] == 0 else 2
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Batch-analyze PDFs and ReasoningContext JSON files.")
+    parser.add_argument("paths", nargs="+", help="PDF/JSON files or directories containing them")
+    parser.add_argument("--output", "-o", help="Write the full batch report (JSON) here")
+    parser.add_argument("--concurrency", type=int, help="Documents in flight (AETHER_BATCH_CONCURRENCY)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache")
+    args = parser.parse_args()
+
+    if args.concurrency:
+        os.environ["AETHER_BATCH_CONCURRENCY"] = str(args.concurrency)
+
+    from app.utils.tracing import exporter
+
+    try:
+        return asyncio.run(run(args))
+    finally:
+        # The exporter thread is a daemon: queued traces are lost unless flushed
+        exporter.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
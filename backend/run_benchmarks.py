@@ -0,0 +1,387 @@
+"""Offline performance benchmarks: analysis pipeline, PDF parsing, PDF report rendering and cold start.
+
+Usage:
+    python run_benchmarks.py
+    python run_benchmarks.py analyze --factors 1 10 50 --iterations 10 --concurrency 4
+    python run_benchmarks.py pdf --pages 1 50 500
+    python run_benchmarks.py startup --iterations 10
+    python run_benchmarks.py all --output bench.json --baseline last_release.json
+
+No Vertex AI credentials are needed: analyses run on the fake LLM backend
+(``AETHER_LLM_BACKEND=fake``) with the latency distribution given by
+``--latency`` (see ``app.utils.llm_backends.parse_latency``). The LLM memo and
+result cache are disabled so every iteration does the full work. Test PDFs
+come from ``generate_messy_report_with_tables.py`` and are cached in
+``--pdf-dir``.
+
+Each case reports p50/p95/mean latency, throughput and the peak Python heap
+(tracemalloc, measured in one extra untimed run so it does not skew the
+timings); the report also records the process's peak RSS. With
+``--baseline`` a case whose p95 grew by more than ``--max-regression``
+fails the run (exit code 3).
+
+The startup suite times ``import app.main`` and the lifespan startup
+(prewarm off) in a fresh interpreter per iteration. It also fails the run
+if importing the app loads any of ``HEAVY_MODULES``, which must only be
+imported by the routes that need them or by the background prewarm.
+"""
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import os
+
+# Before any app import: the benchmark never talks to Vertex AI and never reuses results
+os.environ["AETHER_LLM_BACKEND"] = "fake"
+os.environ["AETHER_LLM_MEMO_SIZE"] = "0"
+os.environ["AETHER_RESULT_CACHE"] = "0"
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+SUITES = ("analyze", "pdf", "report", "startup")
+# Must not be imported by ``import app.main``
+HEAVY_MODULES = ("camelot", "cv2", "pandas", "reportlab", "pdfplumber", "PyPDF2", "google.genai")
+
+# Runs in a fresh interpreter: import time, time until the lifespan startup
+# has finished, and which heavy modules the import pulled in
+STARTUP_PROBE = """
+import asyncio, json, sys, tempfile, time
+from pathlib import Path
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+heavy = [name for name in sys.argv[1:] if name in sys.modules]
+
+async def ready():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+with tempfile.TemporaryDirectory() as jobs_dir:
+    app.main.job_manager.store_dir = Path(jobs_dir)
+    ready_at = asyncio.run(ready())
+print(json.dumps({"import": imported - started, "ready": ready_at - started, "heavy": heavy}))
+"""
+DEFAULT_FACTORS = [1, 5, 20, 50]
+DEFAULT_PAGES = [1, 10, 100, 500]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of ``values`` (``fraction`` in 0..1)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def summarize(latencies: List[float], elapsed: float, peak_bytes: int, **extra: Any) -> Dict[str, Any]:
+    return {
+        **extra,
+        "iterations": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "throughput_per_s": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "peak_heap_mb": round(peak_bytes / 2**20, 2),
+    }
+
+
+async def measure(
+    run_once: Callable[[], Awaitable[Any]], iterations: int, concurrency: int, warmup: int
+) -> Dict[str, Any]:
+    """Time ``iterations`` runs, ``concurrency`` at a time, then trace one more for peak memory."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            await run_once()
+
+        latencies: List[float] = []
+        slots = asyncio.Semaphore(max(1, concurrency))
+
+        async def timed() -> None:
+            async with slots:
+                started = time.perf_counter()
+                await run_once()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(timed() for _ in range(iterations)))
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        try:
+            await run_once()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"latencies": latencies, "elapsed": elapsed, "peak": peak}
+
+
+def sample_context(paragraphs: int = 40, metrics: int = 60):
+    from app.schemas.context import Metric, ReasoningContext
+
+    regions = ["North America", "EMEA", "APAC", "LATAM"]
+    return ReasoningContext(
+        narrative="\n\n".join(
+            f"Section {i}: revenue in {regions[i % 4]} moved {i % 9 - 3}% while churn reached "
+            f"{10 + i % 5}%. The commission change raised payroll but sales velocity improved. "
+            f"CRM data quality issues leave {i % 20}% of opportunities without close dates."
+            for i in range(paragraphs)
+        ),
+        extracted_facts=[f"Fact {i}: pipeline coverage {1 + i % 3}x" for i in range(20)],
+        metrics=[
+            Metric(name=f"Revenue {i}", region=regions[i % 4], value=1.0 + i / 10) for i in range(metrics)
+        ],
+        assumptions=["Market growth continues at 20% YoY"],
+        limitations=["EMEA data is two weeks delayed"],
+    )
+
+
+async def bench_analyze(args: argparse.Namespace, log_dir: Path) -> List[Dict[str, Any]]:
+    from app.orchestrator import AetherOrchestrator
+    from app.utils.llm_backends import FakeBackend
+
+    orchestrator = AetherOrchestrator()
+    orchestrator.log_file = log_dir / "bench_reasoning_logs.jsonl"
+    context = sample_context()
+    results = []
+    for factors in args.factors:
+        orchestrator.llm.backend = FakeBackend(
+            factors=factors, latency=args.latency,
+            throttle_rate=args.throttle_rate, failure_rate=args.failure_rate,
+            malformed_rate=args.malformed_rate, seed=args.seed,
+        )
+        run = await measure(
+            lambda: orchestrator.analyze(context, use_cache=False),
+            args.iterations, args.concurrency, args.warmup,
+        )
+        backend = orchestrator.llm.backend.stats()
+        results.append(summarize(
+            run["latencies"], run["elapsed"], run["peak"],
+            factors=factors, concurrency=args.concurrency, llm_calls=backend["calls"],
+        ))
+    return results
+
+
+def pdf_for(pages: int, pdf_dir: Path) -> Path:
+    from generate_messy_report_with_tables import create_paged_pdf_with_tables
+
+    path = pdf_dir / f"messy_report_{pages}p.pdf"
+    if not path.exists():
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_paged_pdf_with_tables(str(path), pages)
+    return path
+
+
+async def bench_pdf(args: argparse.Namespace, pdf_dir: Path) -> List[Dict[str, Any]]:
+    from app.utils.parse_pool import ParsePool
+
+    parse_pool = ParsePool()
+    parse_pool.max_pages = None
+    await parse_pool.start()
+    results = []
+    try:
+        for pages in args.pages:
+            path = pdf_for(pages, pdf_dir)
+            parsed: Dict[str, Any] = {}
+
+            async def run_once() -> None:
+                parsed.update(await parse_pool.parse_file(str(path)))
+
+            run = await measure(run_once, args.iterations, args.concurrency, args.warmup)
+            results.append(summarize(
+                run["latencies"], run["elapsed"], run["peak"],
+                pages=pages, parse_workers=parse_pool.workers,
+                pages_per_s=round(pages * len(run["latencies"]) / run["elapsed"], 1) if run["elapsed"] else 0.0,
+                metrics_found=len(parsed.get("metrics", [])),
+            ))
+    finally:
+        parse_pool.shutdown()
+    return results
+
+
+async def bench_report(args: argparse.Namespace, log_dir: Path) -> List[Dict[str, Any]]:
+    from app.orchestrator import AetherOrchestrator
+    from app.utils.llm_backends import FakeBackend
+    from app.utils.pdf_generator import AETHERPDFGenerator
+
+    orchestrator = AetherOrchestrator()
+    orchestrator.log_file = log_dir / "bench_reasoning_logs.jsonl"
+    generator = AETHERPDFGenerator()
+    context = sample_context()
+    results = []
+    for factors in args.factors:
+        orchestrator.llm.backend = FakeBackend(factors=factors, latency="fixed:0", seed=args.seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analysis = await orchestrator.analyze(context, use_cache=False)
+        size: Dict[str, int] = {}
+
+        async def run_once() -> None:
+            # Rendering is CPU-bound; run it inline so the timing is pure render time
+            size["bytes"] = len(generator.generate_report(analysis, context.narrative))
+
+        run = await measure(run_once, args.iterations, 1, args.warmup)
+        results.append(summarize(
+            run["latencies"], run["elapsed"], run["peak"], factors=factors, pdf_bytes=size.get("bytes", 0),
+        ))
+    return results
+
+
+async def bench_startup(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    env = {**os.environ, "AETHER_PREWARM": "0", "AETHER_TRACE_FILE": ""}
+    backend_dir = Path(__file__).resolve().parent
+
+    def probe() -> Dict[str, Any]:
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, *HEAVY_MODULES],
+            cwd=backend_dir, env=env, capture_output=True, text=True, check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    for _ in range(args.warmup):
+        await asyncio.to_thread(probe)
+    samples = [await asyncio.to_thread(probe) for _ in range(args.iterations)]
+    heavy = sorted({name for sample in samples for name in sample["heavy"]})
+
+    results = []
+    for stage in ("import", "ready"):
+        latencies = [sample[stage] for sample in samples]
+        case = summarize(latencies, sum(latencies), 0, stage=stage)
+        if stage == "import":
+            case["heavy_modules"] = heavy
+        results.append(case)
+    return results
+
+
+def find_regressions(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Cases whose p95 exceeds the baseline's by more than ``max_regression`` (a fraction)."""
+    regressions = []
+    for suite, cases in report["suites"].items():
+        previous = {_case_key(case): case for case in baseline.get("suites", {}).get(suite, [])}
+        for case in cases:
+            before = previous.get(_case_key(case))
+            if before and before["p95_ms"] > 0 and case["p95_ms"] > before["p95_ms"] * (1 + max_regression):
+                regressions.append(
+                    f"{suite} {_case_key(case)}: p95 {before['p95_ms']}ms -> {case['p95_ms']}ms"
+                )
+    return regressions
+
+
+def heavy_import_regressions(report: Dict[str, Any]) -> List[str]:
+    """Heavy modules loaded by ``import app.main``; checked with or without a baseline."""
+    return [
+        f"startup: import app.main loads {', '.join(case['heavy_modules'])}"
+        for case in report["suites"].get("startup", [])
+        if case.get("heavy_modules")
+    ]
+
+
+def _case_key(case: Dict[str, Any]) -> str:
+    return ", ".join(f"{key}={case[key]}" for key in ("stage", "factors", "pages", "parse_workers", "concurrency") if key in case)
+
+
+def print_table(suite: str, cases: List[Dict[str, Any]]) -> None:
+    print(f"\n{suite}")
+    for case in cases:
+        print(
+            f"  {_case_key(case):<28} p50 {case['p50_ms']:>9.1f}ms  p95 {case['p95_ms']:>9.1f}ms  "
+            f"{case['throughput_per_s']:>8.2f}/s  heap {case['peak_heap_mb']:>7.1f}MB"
+        )
+
+
+async def run(args: argparse.Namespace) -> int:
+    suites = SUITES if args.suite == "all" else (args.suite,)
+    pdf_dir = Path(args.pdf_dir)
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+
+    report: Dict[str, Any] = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "latency": args.latency,
+            "iterations": args.iterations,
+        },
+        "suites": {},
+    }
+    with tempfile.TemporaryDirectory() as log_dir:
+        for suite in suites:
+            if suite == "analyze":
+                cases = await bench_analyze(args, Path(log_dir))
+            elif suite == "pdf":
+                cases = await bench_pdf(args, pdf_dir)
+            elif suite == "startup":
+                cases = await bench_startup(args)
+            else:
+                cases = await bench_report(args, Path(log_dir))
+            report["suites"][suite] = cases
+            print_table(suite, cases)
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    report["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20, 1)
+    print(f"\nPeak RSS {report['peak_rss_mb']}MB")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+    regressions = heavy_import_regressions(report)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions += find_regressions(report, baseline, args.max_regression)
+    for line in regressions:
+        print(f"  REGRESSION  {line}")
+    if regressions:
+        return 3
+    if args.baseline:
+        print(f"No p95 regressions beyond {args.max_regression:.0%} against {args.baseline}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks on the fake LLM backend.")
+    parser.add_argument("suite", nargs="?", default="all", choices=("all",) + SUITES)
+    parser.add_argument("--factors", type=int, nargs="+", default=DEFAULT_FACTORS, help="Factor counts (1-50)")
+    parser.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES, help="PDF page counts (1-500)")
+    parser.add_argument("--iterations", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed runs per case")
+    parser.add_argument("--concurrency", type=int, default=1, help="Runs in flight at once (analyze, pdf)")
+    parser.add_argument("--latency", default="lognormal:0.05,0.5", help="Fake LLM latency per call")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of LLM calls answered 429")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of LLM calls answered 503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of LLM answers malformed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--parse-workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="AETHER_PARSE_WORKERS for the pdf suite; defaults to the production pool size, "
+                             "0 parses in a thread (heap is measured in this process only)")
+    parser.add_argument("--pdf-dir", default=str(Path(tempfile.gettempdir()) / "aether_bench_pdfs"))
+    parser.add_argument("--output", "-o", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 growth (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if any(not 1 <= n <= 50 for n in args.factors):
+        parser.error("--factors values must be between 1 and 50")
+    if any(not 1 <= n <= 500 for n in args.pages):
+        parser.error("--pages values must be between 1 and 500")
+    os.environ["AETHER_PARSE_WORKERS"] = str(args.parse_workers)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""Load-test the API on one uvicorn worker against the fake LLM backend.
+
+Usage:
+    python run_loadtest.py --concurrency 16 --duration 60
+    python run_loadtest.py --rps 5 --mix analyze=6,analyze-pdf=3,analyze-pdf-report=1 --output load.json
+    python run_loadtest.py --url http://127.0.0.1:8000 --rps 2   # an already running server
+
+Unless ``--url`` is given, the app is started with uvicorn (one worker) and
+``AETHER_LLM_BACKEND=fake``, with the fake latency and factor count from
+``--latency`` / ``--factors``; its output goes to ``--server-log``. Requests
+bypass the result cache and the LLM memo is off unless ``--cache`` is set.
+
+``--concurrency N`` keeps N requests in flight (closed loop). ``--rps R``
+starts R requests per second whatever the response times (open loop), up
+to ``--max-in-flight``; requests that would exceed it are counted as
+``dropped``. Each request picks an endpoint from ``--mix`` by weight.
+
+The JSON report (``--output``) has per-endpoint latency percentiles and a
+histogram, status codes and error rates, and a once-per-second timeline
+of completions, errors, in-flight requests, the server's worst event-loop
+lag and its RSS (from ``GET /runtime/stats``). Keys are stable, so two
+reports can be diffed between versions.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+ENDPOINTS = ("analyze", "analyze-pdf", "analyze-pdf-report", "analyze-report")
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is unbounded
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r}; expected one of {', '.join(ENDPOINTS)}")
+        mix.append((name, float(weight or 1)))
+    if not mix or sum(weight for _, weight in mix) <= 0:
+        raise ValueError("--mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class Recorder:
+    """Per-endpoint latencies and statuses, plus per-second buckets for the timeline."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.seconds: Dict[int, Dict[str, int]] = {}
+        self.in_flight = 0
+        self.dropped = 0
+
+    def record(self, endpoint: str, status: str, latency: float) -> None:
+        self.latencies.setdefault(endpoint, []).append(latency)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[status] = counts.get(status, 0) + 1
+        second = self.seconds.setdefault(int(time.perf_counter() - self.started), {"completed": 0, "errors": 0})
+        second["completed"] += 1
+        if status != "200":
+            second["errors"] += 1
+
+    def endpoint_report(self, elapsed: float) -> Dict[str, Any]:
+        report = {}
+        for endpoint in sorted(self.latencies):
+            latencies = self.latencies[endpoint]
+            statuses = self.statuses[endpoint]
+            errors = sum(count for status, count in statuses.items() if status != "200")
+            histogram = {f"le_{bound}ms": 0 for bound in BUCKETS_MS}
+            histogram["inf"] = 0
+            for latency in latencies:
+                ms = latency * 1000
+                bucket = next((f"le_{bound}ms" for bound in BUCKETS_MS if ms <= bound), "inf")
+                histogram[bucket] += 1
+            report[endpoint] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "error_rate": round(errors / len(latencies), 4),
+                "statuses": dict(sorted(statuses.items())),
+                "throughput_per_s": round(len(latencies) / elapsed, 3),
+                "p50_ms": round(percentile(latencies, 0.5) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+                "max_ms": round(max(latencies) * 1000, 1),
+                "histogram": histogram,
+            }
+        return report
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, base_url: str, pdf_bytes: bytes) -> None:
+        self.args = args
+        self.base_url = base_url
+        self.pdf_bytes = pdf_bytes
+        self.mix = parse_mix(args.mix)
+        self.rng = random.Random(args.seed)
+        self.recorder = Recorder()
+        self.timeline: List[Dict[str, Any]] = []
+        self.counter = 0
+
+    def _context(self) -> Dict[str, Any]:
+        # A distinct narrative per request so neither cache can answer it
+        self.counter += 1
+        return {
+            "narrative": (
+                f"Request {self.counter}: revenue in EMEA fell 8% while APAC grew 16%. "
+                "The new commission structure raised payroll 9% and sales velocity 14%. "
+                "Churn rose from 10.5% to 12%; CRM data quality issues persist."
+            ),
+            "extracted_facts": ["Q4 revenue was $5.2M", "Churn rate 12%"],
+            "metrics": [{"name": "Revenue", "region": "EMEA", "value": 1.8}],
+            "assumptions": ["Market growth continues"],
+            "limitations": ["EMEA data delayed"],
+        }
+
+    async def _send(self, client: httpx.AsyncClient, endpoint: str) -> None:
+        params = {} if self.args.cache else {"no_cache": "true"}
+        self.recorder.in_flight += 1
+        started = time.perf_counter()
+        try:
+            if endpoint in ("analyze", "analyze-report"):
+                response = await client.post(f"/{endpoint}", json=self._context(), params=params)
+            else:
+                files = {"file": ("loadtest.pdf", self.pdf_bytes, "application/pdf")}
+                response = await client.post(f"/{endpoint}", files=files, params=params)
+            await response.aread()
+            status = str(response.status_code)
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            self.recorder.in_flight -= 1
+        self.recorder.record(endpoint, status, time.perf_counter() - started)
+
+    def _pick(self) -> str:
+        names = [name for name, _ in self.mix]
+        return self.rng.choices(names, weights=[weight for _, weight in self.mix])[0]
+
+    async def _closed_loop(self, client: httpx.AsyncClient, deadline: float) -> None:
+        async def user() -> None:
+            while time.perf_counter() < deadline:
+                await self._send(client, self._pick())
+
+        await asyncio.gather(*(user() for _ in range(self.args.concurrency)))
+
+    async def _open_loop(self, client: httpx.AsyncClient, deadline: float) -> None:
+        interval = 1.0 / self.args.rps
+        tasks = set()
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            next_at += interval
+            if self.recorder.in_flight >= self.args.max_in_flight:
+                self.recorder.dropped += 1
+                continue
+            task = asyncio.create_task(self._send(client, self._pick()))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _sample_server(self, client: httpx.AsyncClient, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            second = int(time.perf_counter() - self.recorder.started)
+            point: Dict[str, Any] = {"second": second, "in_flight": self.recorder.in_flight}
+            try:
+                response = await client.get("/runtime/stats", params={"window": 1.0}, timeout=5.0)
+                stats = response.json()
+                point["loop_lag_max_ms"] = stats["loop_lag"].get("window_max_ms")
+                point["rss_mb"] = stats["rss_mb"]
+            except (httpx.HTTPError, ValueError, KeyError):
+                point["loop_lag_max_ms"] = point["rss_mb"] = None
+            self.timeline.append(point)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.args.timeout, limits=limits) as client:
+            # Separate client so sampling never queues behind load requests
+            async with httpx.AsyncClient(base_url=self.base_url) as monitor:
+                server_before = (await monitor.get("/runtime/stats")).json()
+                self.recorder.started = time.perf_counter()
+                deadline = self.recorder.started + self.args.duration
+                stop = asyncio.Event()
+                sampler = asyncio.create_task(self._sample_server(monitor, stop))
+                if self.args.rps:
+                    await self._open_loop(client, deadline)
+                else:
+                    await self._closed_loop(client, deadline)
+                elapsed = time.perf_counter() - self.recorder.started
+                stop.set()
+                await sampler
+                server_after = (await monitor.get("/runtime/stats")).json()
+
+        return self._report(elapsed, server_before, server_after)
+
+    def _report(self, elapsed: float, server_before: Dict[str, Any], server_after: Dict[str, Any]) -> Dict[str, Any]:
+        for point in self.timeline:
+            counts = self.recorder.seconds.get(point["second"], {})
+            point["completed"] = counts.get("completed", 0)
+            point["errors"] = counts.get("errors", 0)
+
+        endpoints = self.recorder.endpoint_report(elapsed)
+        total = sum(e["requests"] for e in endpoints.values())
+        errors = sum(e["errors"] for e in endpoints.values())
+        all_latencies = [latency for values in self.recorder.latencies.values() for latency in values]
+        lags = [p["loop_lag_max_ms"] for p in self.timeline if p.get("loop_lag_max_ms") is not None]
+        rss = [p["rss_mb"] for p in self.timeline if p.get("rss_mb") is not None]
+        return {
+            "config": {
+                "mode": "rps" if self.args.rps else "concurrency",
+                "rps": self.args.rps,
+                "concurrency": None if self.args.rps else self.args.concurrency,
+                "duration_seconds": self.args.duration,
+                "mix": dict(self.mix),
+                "cache": self.args.cache,
+                "fake_latency": self.args.latency,
+                "fake_factors": self.args.factors,
+                "pdf_pages": self.args.pdf_pages,
+                "python": platform.python_version(),
+                "cpu_count": os.cpu_count(),
+            },
+            "summary": {
+                "elapsed_seconds": round(elapsed, 2),
+                "requests": total,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "dropped": self.recorder.dropped,
+                "throughput_per_s": round(total / elapsed, 3) if elapsed else 0.0,
+                "p50_ms": round(percentile(all_latencies, 0.5) * 1000, 1),
+                "p95_ms": round(percentile(all_latencies, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(all_latencies, 0.99) * 1000, 1),
+                "loop_lag_max_ms": max(lags) if lags else None,
+                "loop_lag_p95_ms": round(percentile(lags, 0.95), 2) if lags else None,
+                "rss_start_mb": server_before.get("rss_mb"),
+                "rss_peak_mb": max(rss) if rss else None,
+                "rss_end_mb": server_after.get("rss_mb"),
+            },
+            "endpoints": endpoints,
+            "server": {"before": server_before, "after": server_after},
+            "timeline": self.timeline,
+        }
+
+
+def start_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    env = dict(os.environ)
+    env.update({
+        "AETHER_LLM_BACKEND": "fake",
+        "AETHER_FAKE_LATENCY": args.latency,
+        "AETHER_FAKE_FACTORS": str(args.factors),
+    })
+    if not args.cache:
+        # PDF uploads repeat the same document; without this every repeat would be an LLM memo hit
+        env["AETHER_LLM_MEMO_SIZE"] = "0"
+    log = open(args.server_log, "wb")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", "1", "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parent, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    log.close()
+    return process, f"http://127.0.0.1:{args.port}"
+
+
+async def wait_ready(base_url: str, process: Optional[subprocess.Popen], timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.perf_counter() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {process.returncode}; see the server log")
+            try:
+                if (await client.get("/", timeout=1.0)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout:.0f}s")
+
+
+def load_pdf(args: argparse.Namespace) -> bytes:
+    from generate_messy_report_with_tables import create_paged_pdf_with_tables
+
+    path = Path(tempfile.gettempdir()) / f"aether_loadtest_{args.pdf_pages}p.pdf"
+    if not path.exists():
+        create_paged_pdf_with_tables(str(path), args.pdf_pages)
+    return path.read_bytes()
+
+
+async def run(args: argparse.Namespace) -> int:
+    pdf_bytes = load_pdf(args)
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server(args)
+        print(f"Started uvicorn (pid {process.pid}) on {base_url}; log: {args.server_log}")
+    try:
+        await wait_ready(base_url, process, args.startup_timeout)
+        mode = f"{args.rps} rps" if args.rps else f"{args.concurrency} concurrent"
+        print(f"Running {mode} for {args.duration}s, mix {args.mix}")
+        report = await LoadTest(args, base_url, pdf_bytes).run()
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    summary = report["summary"]
+    print(
+        f"\n{summary['requests']} requests in {summary['elapsed_seconds']}s "
+        f"({summary['throughput_per_s']}/s), error rate {summary['error_rate']:.2%}, dropped {summary['dropped']}"
+    )
+    print(f"latency p50 {summary['p50_ms']}ms  p95 {summary['p95_ms']}ms  p99 {summary['p99_ms']}ms")
+    print(f"loop lag max {summary['loop_lag_max_ms']}ms  RSS peak {summary['rss_peak_mb']}MB")
+    for endpoint, stats in report["endpoints"].items():
+        print(
+            f"  {endpoint:<20} {stats['requests']:>6} req  p50 {stats['p50_ms']:>9.1f}ms  "
+            f"p95 {stats['p95_ms']:>9.1f}ms  errors {stats['error_rate']:.2%}"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.output}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load-test the AETHER API on the fake LLM backend.")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="Requests kept in flight (closed loop)")
+    load.add_argument("--rps", type=float, help="Requests started per second (open loop)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    parser.add_argument("--mix", default="analyze=6,analyze-pdf=3,analyze-pdf-report=1",
+                        help=f"Weighted endpoints from {', '.join(ENDPOINTS)}")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Open-loop cap; extra requests are dropped")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--cache", action="store_true", help="Allow result-cache and LLM memo hits (default: no_cache, memo off)")
+    parser.add_argument("--latency", default="lognormal:0.5,0.4", help="Fake LLM latency per call")
+    parser.add_argument("--factors", type=int, default=4, help="Factors the fake backend extracts")
+    parser.add_argument("--pdf-pages", type=int, default=3, help="Pages of the uploaded test PDF")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the endpoint mix")
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the started server")
+    parser.add_argument("--server-log", default=str(Path(tempfile.gettempdir()) / "aether_loadtest_server.log"))
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--output", "-o", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if args.rps is not None and args.rps <= 0:
+        parser.error("--rps must be positive")
+    parse_mix(args.mix)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())